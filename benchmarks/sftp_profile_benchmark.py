@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+'''Measures push and pull throughput of SftpPConnection with different transfer profiles.
+A local paramiko SFTP server serving a temporary directory is used as a stand-in of a real server. It is reached through a proxy, which delays all data by half of the round trip time in each direction.
+
+Usage: sftp_profile_benchmark.py [RTT_MS [SIZE_MB]]   (defaults are 50 ms and 64 MB)
+'''
+
+import os
+import queue
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import paramiko
+
+from rfslib import pconnection_settings
+from rfslib.sftp_pconnection import SftpPConnection, sftp_transfer_profile, SFTP_PROFILE_LAN, SFTP_PROFILE_WAN, SFTP_PROFILE_HIGH_LATENCY
+
+
+PROFILES = [
+  ('no prefetch/pipelining', sftp_transfer_profile(prefetch=False, pipelined=False)),
+  ('default', sftp_transfer_profile()),
+  ('LAN', SFTP_PROFILE_LAN),
+  ('WAN', SFTP_PROFILE_WAN),
+  ('HIGH_LATENCY', SFTP_PROFILE_HIGH_LATENCY),
+]
+
+
+class StubServer(paramiko.ServerInterface):
+  def check_auth_password(self, username, password):
+    return paramiko.AUTH_SUCCESSFUL
+
+  def get_allowed_auths(self, username):
+    return 'password'
+
+  def check_channel_request(self, kind, chanid):
+    return paramiko.OPEN_SUCCEEDED
+
+
+class StubSFTPHandle(paramiko.SFTPHandle):
+  def stat(self):
+    return paramiko.SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+
+class StubSFTPServer(paramiko.SFTPServerInterface):
+  '''Serves the local filesystem (remote paths are local paths).'''
+
+  def list_folder(self, path):
+    return [paramiko.SFTPAttributes.from_stat(os.lstat(os.path.join(path, name)), name) for name in os.listdir(path)]
+
+  def stat(self, path):
+    return paramiko.SFTPAttributes.from_stat(os.stat(path))
+
+  def lstat(self, path):
+    return paramiko.SFTPAttributes.from_stat(os.lstat(path))
+
+  def open(self, path, flags, attr):
+    fd = os.open(path, flags, 0o644)
+
+    if flags & os.O_WRONLY:
+      mode = 'wb'
+    elif flags & os.O_RDWR:
+      mode = 'r+b'
+    else:
+      mode = 'rb'
+
+    handle = StubSFTPHandle(flags)
+    handle.filename = path
+    handle.readfile = handle.writefile = os.fdopen(fd, mode)
+    return handle
+
+  def remove(self, path):
+    os.remove(path)
+    return paramiko.SFTP_OK
+
+  def rename(self, oldpath, newpath):
+    os.rename(oldpath, newpath)
+    return paramiko.SFTP_OK
+
+  def mkdir(self, path, attr):
+    os.mkdir(path)
+    return paramiko.SFTP_OK
+
+  def rmdir(self, path):
+    os.rmdir(path)
+    return paramiko.SFTP_OK
+
+
+def listen():
+  sock = socket.socket()
+  sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+  sock.bind(('127.0.0.1', 0))
+  sock.listen(16)
+  return sock
+
+
+def serve_sftp(sock, host_key):
+  while True:
+    client, _ = sock.accept()
+
+    transport = paramiko.Transport(client)
+    # The window of the server limits uploads, it is large enough to measure the client settings.
+    transport.default_window_size = 128 * 1024 ** 2
+    transport.add_server_key(host_key)
+    transport.set_subsystem_handler('sftp', paramiko.SFTPServer, StubSFTPServer)
+    transport.start_server(server=StubServer())
+
+
+def delayed_pipe(src, dst, delay):
+  '''Forwards data from src to dst, each piece of data is sent delay seconds after it was received.'''
+  pending = queue.Queue()
+
+  def reader():
+    while True:
+      try:
+        data = src.recv(65536)
+      except OSError:
+        data = b''
+
+      pending.put((time.monotonic() + delay, data))
+      if not data:
+        return
+
+  def writer():
+    while True:
+      due, data = pending.get()
+      time.sleep(max(0, due - time.monotonic()))
+
+      try:
+        if not data:
+          dst.shutdown(socket.SHUT_WR)
+          return
+
+        dst.sendall(data)
+      except OSError:
+        return
+
+  for target in (reader, writer):
+    threading.Thread(target=target, daemon=True).start()
+
+
+def serve_proxy(sock, server_port, rtt):
+  while True:
+    client, _ = sock.accept()
+    server = socket.create_connection(('127.0.0.1', server_port))
+
+    delayed_pipe(client, server, rtt / 2)
+    delayed_pipe(server, client, rtt / 2)
+
+
+def measure(function):
+  start = time.perf_counter()
+  function()
+  return time.perf_counter() - start
+
+
+def main(argv):
+  rtt = float(argv[1]) / 1000 if len(argv) > 1 else 0.05
+  size = int(argv[2]) * 1024 ** 2 if len(argv) > 2 else 64 * 1024 ** 2
+
+  server_sock = listen()
+  proxy_sock = listen()
+
+  threading.Thread(target=serve_sftp, args=(server_sock, paramiko.RSAKey.generate(2048)), daemon=True).start()
+  threading.Thread(target=serve_proxy, args=(proxy_sock, server_sock.getsockname()[1], rtt), daemon=True).start()
+
+  with tempfile.TemporaryDirectory() as workdir:
+    local = os.path.join(workdir, 'local')
+    with open(local, 'wb') as f:
+      f.write(os.urandom(size))
+
+    print(f'RTT {rtt * 1000:.0f} ms, file {size / 1024 ** 2:.0f} MB')
+
+    for name, profile in PROFILES:
+      conn = SftpPConnection(pconnection_settings(), '127.0.0.1', 'user', password='password',
+        port=proxy_sock.getsockname()[1], no_host_key_checking=True, transfer_profile=profile)
+
+      remote = os.path.join(workdir, 'remote')
+      pulled = os.path.join(workdir, 'pulled')
+
+      push_time = measure(lambda: conn.push(local, remote))
+      pull_time = measure(lambda: conn.pull(remote, pulled))
+
+      conn.close()
+
+      MB = size / 1024 ** 2
+      print(f'{name:24} push {MB / push_time:8.1f} MB/s   pull {MB / pull_time:8.1f} MB/s')
+
+
+if __name__ == '__main__':
+  main(sys.argv)
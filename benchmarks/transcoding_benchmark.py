@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+'''Measures throughput and memory usage of text transcoding used by push and pull.
+
+Usage: transcoding_benchmark.py [SIZE ...]   (eg. 1M 100M 4G, which is the default)
+'''
+
+import os
+import resource
+import sys
+import tempfile
+import time
+
+from rfslib.ptranscoder import PTranscoder
+
+
+# The line is valid in UTF8 as well as in cp1250 and ISO 8859-2, so all cases can share the input.
+LINE = b'Prilis zlutoucky kun upel dabelske ody;12345;67890\n'
+UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+
+def parse_size(size):
+  if size[-1].upper() in UNITS:
+    return int(size[:-1]) * UNITS[size[-1].upper()]
+  return int(size)
+
+
+def generate(path, size):
+  block = LINE * (1024 * 1024 // len(LINE))
+
+  with open(path, 'wb') as out:
+    written = 0
+    while written < size:
+      # Only whole lines are written, so no character is split at the end of the file.
+      remaining = max((size - written) // len(LINE), 1) * len(LINE)
+      written += out.write(block[:remaining])
+
+  return written
+
+
+CASES = [
+  ('utf8', 'cp1250', False, True),
+  ('utf8', 'utf8', False, True),
+  ('cp1250', 'cp1250', True, False),
+  ('cp1250', 'iso8859-2', False, False),
+]
+
+
+def run(size, workdir):
+  inp_path = os.path.join(workdir, 'input')
+  out_path = os.path.join(workdir, 'output')
+  size = generate(inp_path, size)
+
+  for from_encoding, to_encoding, from_crlf, to_crlf in CASES:
+    transcoder = PTranscoder(from_encoding, to_encoding, from_crlf, to_crlf)
+
+    start = time.perf_counter()
+    with open(inp_path, 'rb') as inp, open(out_path, 'wb') as out:
+      transcoder.copy(inp, out)
+    elapsed = time.perf_counter() - start
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+    case = f'{from_encoding}{"/CRLF" if from_crlf else ""} -> {to_encoding}{"/CRLF" if to_crlf else ""}'
+    print(f'{size / UNITS["M"]:10.1f} MB {case:28} {elapsed:8.2f} s {size / UNITS["M"] / elapsed:10.1f} MB/s   max RSS {max_rss} MB')
+
+  os.unlink(inp_path)
+  os.unlink(out_path)
+
+
+def main(argv):
+  sizes = argv[1:] or ['1M', '100M', '4G']
+
+  with tempfile.TemporaryDirectory() as workdir:
+    for size in sizes:
+      run(parse_size(size), workdir)
+
+
+if __name__ == '__main__':
+  main(sys.argv)
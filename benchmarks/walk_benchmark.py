@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+'''Measures the time of walking a directory tree with 1, 4 and 16 workers over a simulated high latency link.
+Every listing of a directory sleeps for the round trip time before it returns.
+
+Usage: walk_benchmark.py [RTT_MS [FANOUT [DEPTH]]]   (defaults are 20 ms, 6 and 3)
+'''
+
+import os
+import sys
+import tempfile
+import time
+
+from rfslib import pconnection_settings
+from rfslib.fs_pconnection import FsPConnection
+
+
+class LatencyFsPConnection(FsPConnection):
+  '''FsPConnection, which simulates a round trip time of a remote storage on every listing.'''
+
+  rtt = 0.02
+
+  def _scandir(self, remote_path):
+    time.sleep(self.rtt)
+    return super()._scandir(remote_path)
+
+
+def generate(root, fanout, depth):
+  directories = 0
+  level = [root]
+
+  for _ in range(depth):
+    next_level = []
+    for path in level:
+      for i in range(fanout):
+        child = os.path.join(path, f'd{i}')
+        os.mkdir(child)
+        with open(os.path.join(child, 'file'), 'w'):
+          pass
+        next_level.append(child)
+
+    directories += len(next_level)
+    level = next_level
+
+  return directories + 1
+
+
+def main(argv):
+  LatencyFsPConnection.rtt = float(argv[1]) / 1000 if len(argv) > 1 else 0.02
+  fanout = int(argv[2]) if len(argv) > 2 else 6
+  depth = int(argv[3]) if len(argv) > 3 else 3
+
+  with tempfile.TemporaryDirectory() as root:
+    directories = generate(root, fanout, depth)
+    conn = LatencyFsPConnection(pconnection_settings())
+
+    for workers in (1, 4, 16):
+      for ordered in (True, False):
+        start = time.perf_counter()
+        files = sum(len(filenames) for _, _, filenames in conn.walk(root, workers=workers, ordered=ordered))
+        elapsed = time.perf_counter() - start
+
+        mode = 'ordered' if ordered else 'unordered'
+        print(f'{workers:3} workers {mode:10} {directories:6} dirs {files:6} files {elapsed:8.2f} s {directories / elapsed:10.1f} dirs/s')
+
+
+if __name__ == '__main__':
+  main(sys.argv)
@@ -1,16 +1,25 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Iterator, Iterable, Optional, Tuple
 
 import tempfile
+import fnmatch
+import contextlib
+import io
 import os
 import os.path
-import shutil
-import codecs
+import stat
 
 from rfslib import pconnection_settings
 from rfslib.path_utils import path_normalize
+from rfslib.pmetadata_cache import PMetadataCache
+from rfslib.ptranscoder import PTranscoder, CHUNK_SIZE
+from rfslib.pwalker import PWalker
+from rfslib.pexecutor import PExecutor
+from rfslib.pstream import PRawAdapter, PTranscodingReader, PTranscodingWriter, PRemoteWriter
 
 import random
+import threading
+import time
 
 import logging, sys
 
@@ -72,6 +81,106 @@ def _stat_unpack(pk_stat) -> p_stat_result:
   return stat
 
 
+def _copy_range(inp, out, length):
+  '''Copies length bytes from the current position of the binary file object inp to the current position of the binary file object out.
+  Raises an error, if the range isn't copied whole (so a failed range of a chunked transfer is detected, even if the file has the expected size).'''
+  offset = out.tell()
+  remaining = length
+
+  while remaining > 0:
+    data = inp.read(min(remaining, CHUNK_SIZE))
+    if not data:
+      raise EOFError(f"The file ended {remaining} bytes before the end of the copied range.")
+
+    written = out.write(data)
+    if written is not None and written != len(data):
+      raise IOError(f"Only {written} of {len(data)} bytes were written at offset {offset + length - remaining}.")
+
+    remaining -= len(data)
+
+  out.flush()
+  if out.tell() != offset + length:
+    raise IOError(f"The range at offset {offset} ended at {out.tell()} instead of {offset + length}.")
+
+
+class p_transfer_stats():
+  '''Statistics of a recursive transfer (eg. returned by PConnection.rpull).'''
+
+  files:int = 0
+  '''The number of transferred files.'''
+  bytes:int = 0
+  '''The number of transferred bytes (the sizes of the written files).'''
+  seconds:float = 0.0
+  '''The duration of the whole transfer including listing of directories.'''
+
+  def files_per_second(self) -> float:
+    '''Returns the average number of files transferred per second.'''
+    return self.files / self.seconds if self.seconds else 0.0
+
+  def bytes_per_second(self) -> float:
+    '''Returns the average number of bytes transferred per second.'''
+    return self.bytes / self.seconds if self.seconds else 0.0
+
+  def __repr__(self):
+    return f"<p_transfer_stats {self.files} files, {self.bytes} bytes, {self.seconds:.2f} s, {self.files_per_second():.1f} files/s, {self.bytes_per_second() / 1024 ** 2:.2f} MB/s>"
+
+
+class p_dir_entry():
+  '''An entry of a remote directory returned by PConnection.scandir. It attemps to mirror os.DirEntry as closely as possible.
+  Attributes of the entry are fetched together with the listing of the directory, so no further requests are needed (with an exception of symlinks, which are resolved on demand).'''
+
+  name:str = None
+  '''The name of the file.'''
+  path:str = None
+  '''The remote path of the file (the scanned directory joined with name).'''
+
+  def __init__(self, connection, name: str, path: str, lstat: p_stat_result):
+    '''The constructor of p_dir_entry.
+
+    Args:
+      connection: The PConnection, which listed the entry. It is used to resolve symlinks.
+      name: The name of the file.
+      path: The remote path of the file.
+      lstat: Attributes of the file (not following symlinks).
+    '''
+    self.name = name
+    self.path = path
+
+    self.__connection = connection
+    self.__lstat = lstat
+    self.__stat = None
+
+  def is_symlink(self) -> bool:
+    '''Returns True, if the entry is a symlink.'''
+    return self.__lstat.st_mode is not None and stat.S_ISLNK(self.__lstat.st_mode)
+
+  def is_dir(self, follow_symlinks: bool = True) -> bool:
+    '''Returns True, if the entry is a directory (or a symlink pointing to a directory, if follow_symlinks is True).'''
+    if self.is_symlink():
+      return follow_symlinks and self.__connection.isdir(self.path)
+
+    return self.__lstat.st_mode is not None and stat.S_ISDIR(self.__lstat.st_mode)
+
+  def is_file(self, follow_symlinks: bool = True) -> bool:
+    '''Returns True, if the entry isn't a directory (or a symlink pointing to a directory, if follow_symlinks is True).'''
+    if self.is_symlink() and not follow_symlinks:
+      return False
+
+    return not self.is_dir(follow_symlinks=follow_symlinks)
+
+  def stat(self, follow_symlinks: bool = True) -> p_stat_result:
+    '''Returns attributes of the file. Only symlinks followed by follow_symlinks=True need a further request.'''
+    if follow_symlinks and self.is_symlink():
+      if self.__stat is None:
+        self.__stat = self.__connection.stat(self.path)
+      return self.__stat
+
+    return self.__lstat
+
+  def __repr__(self):
+    return f"<p_dir_entry '{self.name}'>"
+
+
 class PConnection(ABC):
   def set_settings(self, settings: pconnection_settings):
     '''The procedure sets all generic settings for PConnection.
@@ -85,6 +194,10 @@ class PConnection(ABC):
         logging.debug(f"Setting self.__{attr} to {getattr(settings, attr)}.")
         exec(f'self._PConnection__{attr} = settings.{attr}')
 
+    if self.__metadata_cache:
+      self.__mcache = PMetadataCache(self.__metadata_cache_ttl, self.__metadata_cache_size)
+    else:
+      self.__mcache = None
 
 
   def get_settings(self) -> pconnection_settings:
@@ -127,6 +240,7 @@ class PConnection(ABC):
         raise AttributeError(f"Parameter settings argument doesn't have attribute {attr}")
 
     self.set_settings(settings)
+    self.__pool = None
     
 
   @abstractmethod
@@ -134,6 +248,28 @@ class PConnection(ABC):
     """Method to close the opened connection."""
     pass
 
+  def clone(self):
+    """Opens a new independent connection to the same remote storage with the same settings. It is used to get connections for worker threads, because a single connection can't be used by more threads at once.
+
+    Returns:
+      A new opened PConnection of the same type.
+    """
+    raise NotImplementedError(f"{type(self).__name__} doesn't support cloning of the connection.")
+
+  def is_alive(self) -> bool:
+    """Checks by a cheap request (bypassing the metadata cache), whether the connection still works. It is used by PConnectionPool to check idle connections.
+
+    Returns:
+      False, if the request failed.
+    """
+    try:
+      self._isdir('/')
+      return True
+
+    except Exception as e:
+      logging.debug(f"The connection is broken: {e}")
+      return False
+
   @abstractmethod
   def _stat(self, remote_path: str) -> os.stat_result:
     """Protected method which returns statistics of a file (eg. size, last date modified,...) Follows symlinks to a destination file.
@@ -191,9 +327,51 @@ class PConnection(ABC):
 
     pass
 
+  def _replace(self, old_name: str, new_name: str):
+    """Protected method which renames/moves a nondirectory file and replaces `new_name`, if it already exists (and it isn't a directory). Where the protocol allows it, the replacement is atomic. Behavior is undefined, if `old_name` file doesn't exist or `new_name` is a directory.
+
+    The default implementation tries _rename and if it fails, because `new_name` exists, it deletes `new_name` by _unlink and calls _rename again. If `old_name` doesn't exist, the error of _rename is raised and `new_name` is kept.
+
+    Args:
+      old_name: Remote path a file to move.
+      new_name: Remote path to which move the file.
+
+    :meta public:
+    """
+    try:
+      self._rename(old_name, new_name)
+
+    except Exception:
+      # Most of protocols refuse to rename a file to an existing one. The target is kept, if the rename failed, because the source is missing.
+      if not self._lexists(new_name) or not self._lexists(old_name):
+        raise
+
+      self._unlink(new_name)
+      self._rename(old_name, new_name)
+
+  def _copy(self, old_name: str, new_name: str):
+    """Protected method which copies a nondirectory file within the remote storage. If `new_name` already exists and it isn't a directory, it is overwritten. Behavior is undefined, if `old_name` file doesn't exist, it is a directory, or destination folder doesn't exist.
+    Backends should copy the data on the server side, if the protocol allows it.
+
+    The default implementation streams the data through memory by _open (in chunks of bounded size), without any local file.
+
+    Args:
+      old_name: Remote path of a file to copy.
+      new_name: Remote path of the copy.
+
+    :meta public:
+    """
+    with contextlib.closing(self._open(old_name, 'rb')) as inp, contextlib.closing(self._open(new_name, 'wb')) as out:
+      while True:
+        data = inp.read(CHUNK_SIZE)
+        if not data:
+          break
+
+        out.write(data)
+
   @abstractmethod
   def _push(self, local_path:str, remote_path:str):
-    """Protected method which uploads/pushes a nondirectory file from a local storage to a remote storage in the binary form. Behavior is undefined if destination folder or source file doesn't exist, source is directory or remote file already exists.
+    """Protected method which uploads/pushes a nondirectory file from a local storage to a remote storage in the binary form. If the remote file already exists and it isn't a directory, it is overwritten. Behavior is undefined if destination folder or source file doesn't exist or source is directory.
 
     Args:
       local_path: Path of a local file to upload.
@@ -295,6 +473,203 @@ class PConnection(ABC):
  
     pass
 
+  def __cached(self, kind, remote_path, fetch):
+    if self.__mcache is None:
+      return fetch(remote_path)
+
+    remote_path = path_normalize(remote_path)
+
+    found, value = self.__mcache.get(kind, remote_path)
+    if not found:
+      value = fetch(remote_path)
+      self.__mcache.put(kind, remote_path, value)
+
+    return value
+
+  def __invalidate(self, remote_path, recursive=False, **known):
+    if self.__mcache is None:
+      return
+
+    remote_path = path_normalize(remote_path)
+    self.__mcache.invalidate(remote_path, recursive=recursive)
+
+    # Metadata, which are known for sure after a successful operation, are stored right away.
+    for kind, value in known.items():
+      self.__mcache.put(kind, remote_path, value)
+
+  def __exists(self, remote_path):
+    return self.__cached('exists', remote_path, self._exists)
+
+  def __lexists(self, remote_path):
+    return self.__cached('lexists', remote_path, self._lexists)
+
+  def __isdir(self, remote_path):
+    return self.__cached('isdir', remote_path, self._isdir)
+
+  def __stat(self, remote_path):
+    return self.__cached('stat', remote_path, self._stat)
+
+  def __lstat(self, remote_path):
+    return self.__cached('lstat', remote_path, self._lstat)
+
+  def __mkdir(self, remote_path):
+    self.__invalidate(remote_path)
+    self._mkdir(remote_path)
+    self.__invalidate(remote_path, exists=True, lexists=True, isdir=True)
+
+  def __rmdir(self, remote_path):
+    self.__invalidate(remote_path, recursive=True)
+    self._rmdir(remote_path)
+    self.__invalidate(remote_path, recursive=True, exists=False, lexists=False, isdir=False)
+
+  def __unlink(self, remote_path):
+    self.__invalidate(remote_path)
+    self._unlink(remote_path)
+    self.__invalidate(remote_path, exists=False, lexists=False, isdir=False)
+
+  def __rename(self, old_name, new_name):
+    self.__invalidate(old_name, recursive=True)
+    self.__invalidate(new_name, recursive=True)
+    self._rename(old_name, new_name)
+    self.__invalidate(old_name, recursive=True, exists=False, lexists=False, isdir=False)
+    self.__invalidate(new_name, recursive=True)
+
+  def __copy(self, old_name, new_name):
+    self.__invalidate(new_name)
+
+    try:
+      self._copy(old_name, new_name)
+
+    except NotImplementedError:
+      # The backend can't stream remote files, the data are staged in a local file.
+      with tempfile.NamedTemporaryFile() as _tmp_file:
+        tmp_file = _tmp_file.name
+        self._pull(old_name, tmp_file)
+        self._push(tmp_file, new_name)
+
+    self.__invalidate(new_name, exists=True, lexists=True, isdir=False)
+
+  def __replace(self, old_name, new_name):
+    self.__invalidate(old_name)
+    self.__invalidate(new_name, recursive=True)
+    self._replace(old_name, new_name)
+    self.__invalidate(old_name, exists=False, lexists=False, isdir=False)
+    self.__invalidate(new_name, recursive=True)
+
+  def __push(self, local_path, remote_path):
+    self.__invalidate(remote_path)
+    self._push(local_path, remote_path)
+    self.__invalidate(remote_path, exists=True, lexists=True, isdir=False)
+
+  def clear_metadata_cache(self, remote_path: str = None, recursive: bool = True):
+    '''Drops cached metadata. Useful, if the remote storage was changed by another client. Does nothing, if the metadata cache is disabled (see pconnection_settings.metadata_cache).
+
+    Args:
+      remote_path: A remote path, whose entries should be dropped. If None, the whole cache is dropped.
+      recursive: If True, entries of all files under remote_path are dropped as well.
+    '''
+    if self.__mcache is None:
+      return
+
+    if remote_path is None:
+      self.__mcache.clear()
+    else:
+      self.__mcache.invalidate(path_normalize(remote_path), recursive=recursive)
+
+  def _scandir(self, remote_path: str) -> Iterable[Tuple[str, os.stat_result]]:
+    """Protected method which lists a folder together with attributes of its files. It might contain '.' and '..'.
+    Undefined if the remote file doesn't exist or isn't a folder.
+
+    The default implementation calls _listdir and _lstat for each file. Backends should override it with a bulk listing of the protocol, which returns attributes in a single round trip.
+
+    Args:
+      remote_path: The remote path of a remote folder.
+
+    Returns:
+      An iterable of pairs (name, stat), where stat is an os.stat_result like object (not following symlinks), which is further parsed by _stat_unpack function. It has to contain st_mode.
+
+    :meta public:
+    """
+    for name in self._listdir(remote_path):
+      if name in ('.', '..'):
+        continue
+
+      yield name, self._lstat(os.path.join(remote_path, name))
+
+  def _scandir_pattern(self, remote_path: str, pattern: str) -> Optional[Iterable[Tuple[str, os.stat_result]]]:
+    """Protected method which lists only files of a folder, whose names match a wildcard pattern, if the protocol can filter the listing on the server side. Same as _scandir otherwise.
+    The pattern contains only wildcards '*' and '?'. The server may use its own matching rules (eg. case insensitive), the result is filtered by fnmatch.fnmatchcase afterwards, so it only must not miss any matching file.
+
+    The default implementation returns None, which means that server side filtering isn't supported (and _scandir is used instead).
+
+    Args:
+      remote_path: The remote path of a remote folder.
+      pattern: The wildcard pattern.
+
+    Returns:
+      An iterable of pairs (name, stat) (see _scandir) or None.
+
+    :meta public:
+    """
+    return None
+
+  def _open(self, remote_path: str, mode: str):
+    """Protected method which opens a remote nondirectory file as a binary file-like object. Mode is 'rb', 'wb' or 'r+b'. Mode 'wb' creates the file or truncates it, if it already exists.
+    Mode 'r+b' opens an existing file for writing at arbitrary offsets (after seek) without truncation. It is needed only if _can_write_at_offset returns True.
+    Behavior is undefined if the remote file doesn't exist (in modes 'rb' and 'r+b'), it is a directory, or destination folder doesn't exist.
+
+    The default implementation raises NotImplementedError.
+
+    Args:
+      remote_path: Path of a remote file.
+      mode: 'rb', 'wb' or 'r+b'.
+
+    Returns:
+      A file-like object with method read (or write) and close. It should also provide methods seek and tell, if the protocol supports them. Instances of io.IOBase are used directly, other objects are wrapped.
+
+    :meta public:
+    """
+    raise NotImplementedError(f"{type(self).__name__} doesn't support streaming of remote files.")
+
+  def _can_write_at_offset(self) -> bool:
+    """Protected method which tells, whether files opened by _open support seek in modes 'rb' and 'r+b', so ranges of a file can be transferred independently (see pconnection_settings.chunked_transfer_workers).
+
+    The default implementation returns False.
+
+    :meta public:
+    """
+    return False
+
+  def _read_bytes(self, remote_path: str) -> bytes:
+    """Protected method which reads whole content of a remote nondirectory file into memory in the binary form. Behavior is undefined if the remote file doesn't exist or it is a directory.
+
+    The default implementation uses _open.
+
+    Args:
+      remote_path: Path of a remote file.
+
+    Returns:
+      The content of the file.
+
+    :meta public:
+    """
+    with self._open(remote_path, 'rb') as remote_file:
+      return remote_file.read()
+
+  def _write_bytes(self, remote_path: str, data: bytes):
+    """Protected method which writes data from memory to a remote nondirectory file in the binary form. If the remote file already exists and it isn't a directory, it is overwritten. Behavior is undefined if destination folder doesn't exist.
+
+    The default implementation uses _open.
+
+    Args:
+      remote_path: Path of a remote file.
+      data: The new content of the file.
+
+    :meta public:
+    """
+    with self._open(remote_path, 'wb') as remote_file:
+      remote_file.write(data)
+
   def exists(self, remote_path:str) -> bool:
     """Method which checks, whether a remote file exist. Returns False for broken symlinks.
     
@@ -309,7 +684,7 @@ class PConnection(ABC):
     logging.debug("Does remote file {} exist?".format(remote_path))
 
     remote_path = path_normalize(remote_path)
-    ret = self._exists(remote_path)
+    ret = self.__exists(remote_path)
 
     logging.debug("Remote file {} exists: {}".format(remote_path, ret))
     return ret
@@ -327,11 +702,24 @@ class PConnection(ABC):
     logging.debug(f"Does remote file {remote_path} lexist?")
 
     remote_path = path_normalize(remote_path)
-    ret = self._lexists(remote_path)
+    ret = self.__lexists(remote_path)
 
     logging.debug(f"Remote file {remote_path} lexists: {ret}")
     return ret
 
+  def __validated(self, validation, action):
+    '''Runs validation and then action. If skip_validation is enabled, action is run right away and validation is run only when action fails,
+    so the failure is still reported with the same exception type as it would be without skip_validation.'''
+    if not self.__skip_validation:
+      validation()
+      return action()
+
+    try:
+      return action()
+    except Exception:
+      validation()
+      raise
+
   def __check_link_existance(self, remote_path):
     if not self.lexists(remote_path):
       raise FileNotFoundError(f"Remote file {remote_path} not found.")
@@ -344,23 +732,37 @@ class PConnection(ABC):
 
 
   def __check_file_nonexistance(self, remote_path):
-    if self._lexists(remote_path):
+    if self.__lexists(remote_path):
       raise InterruptedError(f"Remote destination file {remote_path} exists.")
 
   def __check_not_folder(self, remote_path):
     self.__check_file_existance(remote_path)
 
-    if self._isdir(remote_path):
+    if self.__isdir(remote_path):
       raise IsADirectoryError(f"Remote file {remote_path} is a directory.")
 
+  def __check_not_folder_size(self, remote_path):
+    '''Validates like __check_not_folder, but by a single stat of an existing file. Returns the size of the file.'''
+    try:
+      attributes = _stat_unpack(self.__stat(remote_path))
+    except Exception:
+      # The file is checked again to raise the same exception as __check_not_folder.
+      self.__check_not_folder(remote_path)
+      raise
+
+    if attributes.st_mode is not None and stat.S_ISDIR(attributes.st_mode):
+      raise IsADirectoryError(f"Remote file {remote_path} is a directory.")
+
+    return attributes.st_size
+
   def __check_potencial_not_folder(self, remote_path):
-    if self._lexists(remote_path) and self._isdir(remote_path):
+    if self.__lexists(remote_path) and self.__isdir(remote_path):
       raise IsADirectoryError("Remote file {} is a directory.".format(remote_path))
   
   def __check_is_folder(self, remote_path):
     self.__check_file_existance(remote_path)
 
-    if not self._isdir(remote_path):
+    if not self.__isdir(remote_path):
       raise NotADirectoryError(f"Remote file {remote_path} is not a directory.")
 
 
@@ -394,8 +796,11 @@ class PConnection(ABC):
       An object whose attributes correspond to the attributes of Python’s stat structure as returned by os.stat, except that it contains fewer fields.
 
     """
-    self.__check_file_existance(remote_path)
-    return _stat_unpack( self._stat(remote_path) )
+    remote_path = path_normalize(remote_path)
+
+    return self.__validated(
+      lambda: self.__check_file_existance(remote_path),
+      lambda: _stat_unpack( self.__stat(remote_path) ))
 
   def lstat(self, remote_path: str) -> p_stat_result:
     """Returns statistics of a file (eg. size, last date modified,...)  Doesn't follow symlinks.
@@ -407,38 +812,46 @@ class PConnection(ABC):
       An object whose attributes correspond to the attributes of Python’s stat structure as returned by os.stat, except that it contains fewer fields.
 
     """
-    self.__check_link_existance(remote_path)
-    return _stat_unpack( self._lstat(remote_path) )
-
-  def __encode(self, from_lpath, to_lpath):
-    if self.__text_transmission:
+    remote_path = path_normalize(remote_path)
 
-      with open(from_lpath, 'rb') as inp, open(to_lpath, 'wb') as out:
-        inp = inp.read()
-        decoded = codecs.decode(inp, encoding="utf8")
+    return self.__validated(
+      lambda: self.__check_link_existance(remote_path),
+      lambda: _stat_unpack( self.__lstat(remote_path) ))
 
-        if self.__remote_crlf:
-          decoded = decoded.replace('\n', '\r\n')
-        
-        bout = codecs.encode(decoded, encoding=self.__remote_encoding)
-        out.write(bout)
+  def __transcoder(self, upload):
+    '''Returns a new PTranscoder for an upload (or a download, if upload is False) or None, if data are transmitted without any change.'''
+    if not self.__text_transmission:
+      return None
 
+    if upload:
+      transcoder = PTranscoder(self.__local_encoding, self.__remote_encoding, self.__local_crlf, self.__remote_crlf)
     else:
-      shutil.copyfile(from_lpath, to_lpath)
+      transcoder = PTranscoder(self.__remote_encoding, self.__local_encoding, self.__remote_crlf, self.__local_crlf)
 
-  def __decode(self, from_lpath, to_lpath):
-    if self.__text_transmission:
-      with open(from_lpath, 'rb') as inp, open(to_lpath, 'wb') as out:
-        binp = inp.read()
-        decoded = codecs.decode(binp, encoding=self.__remote_encoding)
+    if transcoder.is_identity():
+      return None
 
-        if self.__remote_crlf:
-          decoded = decoded.replace('\r\n', '\n')
-        
-        bout = codecs.encode(decoded, encoding="utf8")
-        out.write(bout)
-    else:
-      shutil.copyfile(from_lpath, to_lpath)
+    return transcoder
+
+  def __transcode_file(self, transcoder, from_lpath, to_lpath):
+    with open(from_lpath, 'rb') as inp, open(to_lpath, 'wb') as out:
+      transcoder.copy(inp, out)
+
+  def __remove_local_tmp_file(self, local_path):
+    try:
+      os.unlink(local_path)
+    except FileNotFoundError:
+      pass
+
+  def __remove_remote_tmp_file(self, remote_path):
+    self.__invalidate(remote_path)
+
+    try:
+      self._unlink(remote_path)
+    except FileNotFoundError:
+      pass
+    except Exception as e:
+      logging.warning(f"Temporary remote file {remote_path} can't be removed: {e}")
 
   def __infolder_tmp_file(self, path):
     dirname, basename = os.path.split(path)
@@ -460,48 +873,288 @@ class PConnection(ABC):
     remote_path = path_normalize(remote_path)
     local_path = path_normalize(local_path)
     
-    self.__check_local_file_not_folder(local_path)
-    self.__check_potencial_not_folder(remote_path)
+    def validation():
+      self.__check_local_file_not_folder(local_path)
+      self.__check_potencial_not_folder(remote_path)
+
+    self.__validated(validation, lambda: self.__push_file(local_path, remote_path))
+
+    logging.debug(f"Pushing local file {local_path} to the remote file {remote_path} is completed.")
+
+  def __push_file(self, local_path, remote_path):
+    '''Uploads a local file without any validation.'''
+    def upload(source_path):
+      if self.__direct_write:
+        self.__push_any(source_path, remote_path)
+
+      else:
+        tmp_file = self.__infolder_tmp_file(remote_path)
+
+        try:
+          self.__push_any(source_path, tmp_file)
+          self.__replace(tmp_file, remote_path)
+        except BaseException:
+          self.__remove_remote_tmp_file(tmp_file)
+          raise
+
+    transcoder = self.__transcoder(upload=True)
+
+    # Without transcoding, the local file is uploaded as it is.
+    if transcoder is None:
+      upload(local_path)
+      return
 
     with tempfile.NamedTemporaryFile() as _tmp_file:
       tmp_file = _tmp_file.name
     
-      self.__encode(local_path, tmp_file)
+      self.__transcode_file(transcoder, local_path, tmp_file)
+      upload(tmp_file)
 
-      tmp_file2 = self.__infolder_tmp_file(remote_path)
-      self._push(tmp_file, tmp_file2)
-      self.fmv(tmp_file2, remote_path)
+  def __chunking(self):
+    '''Returns True, if large files may be transferred in chunks (see pconnection_settings.chunked_transfer_workers).'''
+    return self.__chunked_transfer_workers > 1 and self._can_write_at_offset()
 
-    logging.debug(f"Pushing local file {local_path} to the remote file {remote_path} is completed.")
+  def __chunked(self, size):
+    '''Returns True, if a file of the size should be transferred in chunks (see pconnection_settings.chunked_transfer_workers).'''
+    return size >= self.__chunked_transfer_threshold and self.__chunking()
+
+  def __transfer_chunks(self, size, transfer_range):
+    '''Calls transfer_range(connection, offset, length) for all ranges of a file of the size concurrently.'''
+    chunk_size = self.__chunked_transfer_chunk_size
+    chunks = [(offset, min(chunk_size, size - offset)) for offset in range(0, size, chunk_size)]
+
+    with self.__worker_connections(min(self.__chunked_transfer_workers, len(chunks)) - 1) as connections:
+      PExecutor([self] + connections).run(lambda connection, chunk: transfer_range(connection, *chunk), chunks)
+
+  def __push_any(self, local_path, remote_path):
+    '''Uploads a local file by _push, or in chunks, if it is large enough.'''
+    size = os.path.getsize(local_path)
+
+    if not self.__chunked(size):
+      self.__push(local_path, remote_path)
+      return
+
+    logging.debug(f"Pushing local file {local_path} to {remote_path} in chunks ({size} bytes).")
+
+    self.__invalidate(remote_path)
+
+    # The file is created (or truncated) first, the ranges are written into it afterwards.
+    with contextlib.closing(self._open(remote_path, 'wb')):
+      pass
+
+    def push_range(connection, offset, length):
+      with open(local_path, 'rb') as inp, contextlib.closing(connection._open(remote_path, 'r+b')) as out:
+        inp.seek(offset)
+        out.seek(offset)
+        _copy_range(inp, out, length)
+
+    self.__transfer_chunks(size, push_range)
+
+    remote_size = _stat_unpack(self._stat(remote_path)).st_size
+    if remote_size != size:
+      raise IOError(f"Chunked push of {local_path} to {remote_path} failed: the remote file has {remote_size} bytes instead of {size}.")
+
+    self.__invalidate(remote_path, exists=True, lexists=True, isdir=False)
+
+  def __pull_any(self, remote_path, local_path, size=None):
+    '''Downloads a remote file by _pull, or in chunks, if it is large enough. The size of the remote file is requested only if it isn't given and chunked transfers are enabled.'''
+    if size is None and self.__chunking():
+      size = _stat_unpack(self.__stat(remote_path)).st_size
+
+    if size is None or not self.__chunked(size):
+      self._pull(remote_path, local_path)
+      return
+
+    logging.debug(f"Pulling remote file {remote_path} to {local_path} in chunks ({size} bytes).")
+
+    with open(local_path, 'wb') as out:
+      out.truncate(size)
+
+    def pull_range(connection, offset, length):
+      with contextlib.closing(connection._open(remote_path, 'rb')) as inp, open(local_path, 'r+b') as out:
+        inp.seek(offset)
+        out.seek(offset)
+        _copy_range(inp, out, length)
+
+    self.__transfer_chunks(size, pull_range)
+
+    remote_size = _stat_unpack(self._stat(remote_path)).st_size
+    if remote_size != size:
+      raise IOError(f"Chunked pull of {remote_path} to {local_path} failed: the remote file changed its size from {size} to {remote_size} bytes.")
+
+  def __wrap_stream(self, stream, reading, text):
+    if not isinstance(stream, io.IOBase):
+      if reading:
+        stream = io.BufferedReader(PRawAdapter(stream))
+      else:
+        stream = io.BufferedWriter(PRawAdapter(stream))
+
+    if text:
+      encoding, crlf = self.__text_codec()
+
+      if reading:
+        return io.TextIOWrapper(stream, encoding=encoding, newline=None)
+      else:
+        return io.TextIOWrapper(stream, encoding=encoding, newline='\r\n' if crlf else '\n')
+
+    transcoder = self.__transcoder(upload=not reading)
+    if transcoder is None:
+      return stream
+
+    if reading:
+      return io.BufferedReader(PTranscodingReader(stream, transcoder))
+    else:
+      return io.BufferedWriter(PTranscodingWriter(stream, transcoder))
+
+  def open(self, remote_path: str, mode: str = 'rb'):
+    """Opens a remote nondirectory file as a stream, so it can be read or written without a local copy.
+
+    In binary modes, the data are transcoded between remote and local encoding and line endings, if text_transmission is enabled. (Seeking is not possible in such case.)
+    In text modes, the stream returns/accepts str. The data are decoded using remote_encoding and remote_crlf, if text_transmission is enabled, and using local_encoding and local_crlf otherwise.
+
+    A stream opened for writing finishes the write, when it is closed. If direct_write is disabled, the data are written to a temporary file, which replaces remote_path on close.
+    If the stream is used in the with statement and an exception is raised inside, the temporary file is removed instead.
+
+    Args:
+      remote_path: Path of a remote file.
+      mode: 'rb' or 'r' for reading, 'wb' or 'w' for writing (the file is created or truncated).
+
+    Returns:
+      A file object. Streams opened for reading are seekable, if the protocol supports it.
+    """
+    logging.debug(f"Opening remote file {remote_path} (mode={mode}).")
+
+    if mode not in ('r', 'rb', 'w', 'wb'):
+      raise ValueError(f"Invalid mode {mode}.")
+
+    remote_path = path_normalize(remote_path)
+    text = 'b' not in mode
+
+    if mode[0] == 'r':
+      stream = self.__validated(
+        lambda: self.__check_not_folder(remote_path),
+        lambda: self._open(remote_path, 'rb'))
+
+      return self.__wrap_stream(stream, reading=True, text=text)
+
+    if self.__direct_write:
+      target = remote_path
+    else:
+      target = self.__infolder_tmp_file(remote_path)
+
+    def action():
+      self.__invalidate(target)
+      return self._open(target, 'wb')
+
+    stream = self.__validated(lambda: self.__check_potencial_not_folder(remote_path), action)
+
+    def commit():
+      self.__invalidate(target, exists=True, lexists=True, isdir=False)
+
+      if target != remote_path:
+        self.__replace(target, remote_path)
+
+      logging.debug(f"Writing of remote file {remote_path} is completed.")
+
+    def abort():
+      if target != remote_path:
+        self.__remove_remote_tmp_file(target)
+      else:
+        self.__invalidate(target)
+
+    return PRemoteWriter(self.__wrap_stream(stream, reading=False, text=text), commit, abort)
 
   #recursive push
-  def rpush(self, local_path: str, remote_path: str):
-    logging.debug(f"Recursive pushing of local file {local_path} to the remote file {remote_path}.")
+  def rpush(self, local_path: str, remote_path: str, workers: int = 1):
+    '''
+    Public method which uploads a local file or a local folder (recursively) to remote_path.
+
+    The directory skeleton is created first, then the files are uploaded. If workers is greater than 1, files are uploaded concurrently over worker connections (cloned, or taken from the pool, see PConnectionPool) with a bounded queue of pending uploads.
+    The first failed upload cancels the uploads, which haven't been started yet, and the error of the earliest failed file is raised.
+
+    Directories, which are created by rpush, are known to be empty, so no checks are done for their content.
+
+    Args:
+      local_path: The path of a local file or folder.
+      remote_path: The remote path, where to upload it.
+      workers: The number of files uploaded concurrently.
+
+    '''
+    logging.debug(f"Recursive pushing of local file {local_path} to the remote file {remote_path} (workers={workers}).")
 
     remote_path = path_normalize(remote_path)
     local_path = path_normalize(local_path)
 
     self.__check_local_file_existance(local_path)
 
-    if os.path.isdir(local_path):
-      if self.lexists(remote_path): 
-        if not self.isdir(remote_path):
-          raise InterruptedError(f"Cannot upload a folder {local_path} to a non-folder path {remote_path}.")
-        else:
-          self.mkdir(remote_path)
-        
-      for l_file in os.listdir(local_path):
-        self.rpush(os.path.join(local_path, l_file), os.path.join(remote_path, l_file))
-        
+    if not os.path.isdir(local_path):
+      self.__validated(
+        lambda: self.__check_rpush_file_target(local_path, remote_path),
+        lambda: self.__push_file(local_path, remote_path))
+
     else:
-      if self.lexists(remote_path): 
-        if self.isdir(remote_path):
-          raise InterruptedError(f"Cannot upload a non-folder {local_path} to a folder path {remote_path}")
+      fresh_dirs = self.__rpush_skeleton(local_path, remote_path)
+
+      def tasks():
+        for dirpath, dirnames, filenames in os.walk(local_path, onerror=self.__raise, followlinks=True):
+          remote_dir = self.__relocate(dirpath, local_path, remote_path)
+
+          for name in filenames:
+            yield os.path.join(dirpath, name), os.path.join(remote_dir, name), fresh_dirs[dirpath]
+
+      with self.__worker_connections(workers - 1) as connections:
+        try:
+          done = PExecutor([self] + connections).run(lambda connection, task: connection.__rpush_file(*task), tasks())
+        finally:
+          # Files uploaded by the other connections aren't known to the metadata cache of this one.
+          if connections:
+            self.__invalidate(remote_path, recursive=True)
 
-      self.push(local_path, remote_path)
+      logging.debug(f"Recursive pushing uploaded {done} files.")
 
     logging.debug(f"Recursive pushing of local file {local_path} to the remote file {remote_path} is completed.")
 
+  @staticmethod
+  def __relocate(path, old_root, new_root):
+    '''Returns the path, which has the same position relative to new_root as path has relative to old_root.'''
+    relative = os.path.relpath(path, old_root)
+    if relative == '.':
+      return new_root
+
+    return os.path.join(new_root, relative)
+
+  def __rpush_skeleton(self, local_path, remote_path):
+    '''Creates remote directories for all local ones. Returns a dictionary, which tells for each local directory, whether its remote counterpart was created (and so it is empty).'''
+    fresh_dirs = {}
+
+    for dirpath, dirnames, filenames in os.walk(local_path, onerror=self.__raise, followlinks=True):
+      remote_dir = self.__relocate(dirpath, local_path, remote_path)
+      parent_fresh = fresh_dirs.get(os.path.dirname(dirpath), False) and dirpath != local_path
+
+      if not parent_fresh and self.__lexists(remote_dir):
+        if not self.__isdir(remote_dir):
+          raise InterruptedError(f"Cannot upload a folder {dirpath} to a non-folder path {remote_dir}.")
+
+        fresh_dirs[dirpath] = False
+
+      else:
+        self.__mkdir(remote_dir)
+        fresh_dirs[dirpath] = True
+
+    return fresh_dirs
+
+  def __check_rpush_file_target(self, local_path, remote_path):
+    if self.__lexists(remote_path) and self.__isdir(remote_path):
+      raise InterruptedError(f"Cannot upload a non-folder {local_path} to a folder path {remote_path}")
+
+  def __rpush_file(self, local_path, remote_path, fresh):
+    if fresh:
+      self.__push_file(local_path, remote_path)
+    else:
+      self.__validated(
+        lambda: self.__check_rpush_file_target(local_path, remote_path),
+        lambda: self.__push_file(local_path, remote_path))
+
 
   def pull(self, remote_path: str, local_path: str):
     logging.debug(f"Pulling remote file {remote_path} to the local file {local_path}.")
@@ -509,49 +1162,136 @@ class PConnection(ABC):
     remote_path = path_normalize(remote_path)
     local_path = path_normalize(local_path)
 
-    self.__check_not_folder(remote_path)
-    self.__check_local_potencial_file_not_folder(local_path)
+    size = None
 
-    with tempfile.NamedTemporaryFile() as _tmp_file:
-      tmp_file = _tmp_file.name
-       
-      self._pull(remote_path, tmp_file)
+    def validation():
+      nonlocal size
 
-      tmp_file2 = self.__infolder_tmp_file(local_path)
-      self.__decode(tmp_file, tmp_file2)
+      # The size decides about a chunked transfer, so the file is validated by a stat, which returns it.
+      if self.__chunking():
+        size = self.__check_not_folder_size(remote_path)
+      else:
+        self.__check_not_folder(remote_path)
+
+      self.__check_local_potencial_file_not_folder(local_path)
 
-      shutil.move(tmp_file2, local_path)
+    self.__validated(validation, lambda: self.__pull(remote_path, local_path, size))
 
     logging.debug(f"Pulling remote file {remote_path} to the local file {local_path} is completed.")
 
+  def __pull(self, remote_path, local_path, size=None):
+    transcoder = self.__transcoder(upload=False)
+
+    # The file is downloaded next to local_path, so the final move is an atomic rename within one filesystem.
+    tmp_file = self.__infolder_tmp_file(local_path)
+
+    try:
+      if transcoder is None:
+        self.__pull_any(remote_path, tmp_file, size)
+
+      else:
+        tmp_file2 = self.__infolder_tmp_file(local_path)
+
+        try:
+          self.__pull_any(remote_path, tmp_file2, size)
+          self.__transcode_file(transcoder, tmp_file2, tmp_file)
+        finally:
+          self.__remove_local_tmp_file(tmp_file2)
+
+      os.replace(tmp_file, local_path)
+
+    except BaseException:
+      self.__remove_local_tmp_file(tmp_file)
+      raise
+
   #recursive pull
-  def rpull(self, remote_path: str, local_path: str):
-    logging.debug(f"Recursive pulling of remote file {remote_path} to the local file {local_path}.")
+  def rpull(self, remote_path: str, local_path: str, workers: int = 1) -> p_transfer_stats:
+    '''
+    Public method which downloads a remote file or a remote folder (recursively) to local_path.
+
+    Directories are listed (and the local directories are created) while files are downloaded, so listing of further directories overlaps with the downloads. If workers is greater than 1, directories are listed concurrently by the parallel walk (see walk) and files are downloaded concurrently over worker connections (cloned, or taken from the pool, see PConnectionPool).
+    Each file is downloaded to a temporary file in the target directory, which is renamed to the target path, when the download finishes. The first failed download cancels the downloads, which haven't been started yet.
+
+    Args:
+      remote_path: The path of a remote file or folder.
+      local_path: The local path, where to download it.
+      workers: The number of files downloaded concurrently.
+
+    Returns:
+      Statistics of the transfer.
+
+    '''
+    logging.debug(f"Recursive pulling of remote file {remote_path} to the local file {local_path} (workers={workers}).")
 
     remote_path = path_normalize(remote_path)
     local_path = path_normalize(local_path)
 
+    stats = p_transfer_stats()
+    start = time.monotonic()
+
     self.__check_file_existance(remote_path)
     
     if self.isdir(remote_path):
-      if os.path.lexists(local_path):
-        if not os.path.isdir(local_path):
-          raise InterruptedError(f"Cannot download a folder {remote_path} to a non-folder path {local_path}.")
-      else:
-        os.mkdir(local_path)
-      
-      for r_file in self.ls(remote_path):
-        self.rpull(os.path.join(remote_path, r_file), os.path.join(local_path, r_file))
+      self.__rpull_tree(remote_path, local_path, workers, stats)
         
     else:
-      if os.path.lexists(local_path):
-        if os.path.isdir(local_path):
-          raise InterruptedError(f"Cannot download a non-folder {remote_path} to a folder path {local_path}.")
-      
+      self.__rpull_local_file(remote_path, local_path)
       self.pull(remote_path, local_path)
+
+      stats.files = 1
+      stats.bytes = os.path.getsize(local_path)
+
+    stats.seconds = time.monotonic() - start
       
-    logging.debug(f"Recursive pulling of remote file {remote_path} to the local file {local_path} is completed.")
-  
+    logging.debug(f"Recursive pulling of remote file {remote_path} to the local file {local_path} is completed: {stats}.")
+    return stats
+
+  def __rpull_local_dir(self, remote_path, local_path):
+    if os.path.lexists(local_path):
+      if not os.path.isdir(local_path):
+        raise InterruptedError(f"Cannot download a folder {remote_path} to a non-folder path {local_path}.")
+    else:
+      os.mkdir(local_path)
+
+  def __rpull_local_file(self, remote_path, local_path):
+    if os.path.lexists(local_path):
+      if os.path.isdir(local_path):
+        raise InterruptedError(f"Cannot download a non-folder {remote_path} to a folder path {local_path}.")
+
+  def __rpull_tree(self, remote_path, local_path, workers, stats):
+    lock = threading.Lock()
+
+    def tasks():
+      self.__rpull_local_dir(remote_path, local_path)
+
+      # Types of files are known from the listings, so they are not checked again. The order of directories doesn't matter, a directory is always listed after its parent.
+      for dirpath, dirs, files in self.__walk(remote_path, True, self.__raise, True, workers, ordered=False):
+        local_dir = self.__relocate(dirpath, remote_path, local_path)
+
+        # Local directories are created before any file of the directory is queued.
+        for entry in dirs:
+          self.__rpull_local_dir(entry.path, os.path.join(local_dir, entry.name))
+
+        for entry in files:
+          # Sizes of symlinks are those of the links, so the size of their targets is requested, if it is needed.
+          size = None if entry.is_symlink() else entry.stat(follow_symlinks=False).st_size
+          yield entry.path, os.path.join(local_dir, entry.name), size
+
+    def download(connection, task):
+      r_file, l_file, r_size = task
+
+      self.__rpull_local_file(r_file, l_file)
+      connection.__pull(r_file, l_file, r_size)
+      size = os.path.getsize(l_file)
+
+      with lock:
+        stats.files += 1
+        stats.bytes += size
+
+    # The connection itself lists the directories, so it isn't one of the workers.
+    with self.__worker_connections(workers if workers > 1 else 0) as connections:
+      PExecutor(connections or [self]).run(download, tasks())
+
   def listdir(self, remote_path: str):
     '''
     Public method which returns a list of files in the folder including hidden files. It never returns '.' or '..'.
@@ -566,8 +1306,12 @@ class PConnection(ABC):
     logging.debug(f"Listing file {remote_path}.")
 
     remote_path = path_normalize(remote_path)
-    self.__check_is_folder(remote_path)
-    
+
+    return self.__validated(
+      lambda: self.__check_is_folder(remote_path),
+      lambda: self.__listdir(remote_path))
+
+  def __listdir(self, remote_path):
     raw_list = self._listdir(remote_path)
     
     ret = []
@@ -577,36 +1321,274 @@ class PConnection(ABC):
 
     return ret
 
+  def scandir(self, remote_path: str, pattern: str = None) -> Iterator[p_dir_entry]:
+    '''
+    Public method which lists a folder together with attributes of its files (including hidden files). It never returns '.' or '..'.
+    Unlike listdir followed by isdir or stat on each file, the attributes are fetched in a single round trip (if the protocol allows it).
+
+    Args:
+      remote_path: The remote path of a remote folder.
+      pattern: If given, only files with names matching the wildcard pattern (by fnmatch.fnmatchcase) are returned. If the pattern contains only wildcards '*' and '?', it is passed to the server, if the protocol can filter the listing (eg. SMB).
+
+    Returns:
+      An iterator of p_dir_entry objects.
+
+    '''
+    logging.debug(f"Scanning directory {remote_path}.")
+
+    remote_path = path_normalize(remote_path)
+
+    raw_entries = self.__validated(
+      lambda: self.__check_is_folder(remote_path),
+      lambda: iter(self.__scandir_raw(remote_path, pattern)))
 
-  def find(self, remote_path: str, child_first: bool = False) -> List[str]:
+    if pattern is not None:
+      raw_entries = ((name, raw_lstat) for name, raw_lstat in raw_entries if fnmatch.fnmatchcase(name, pattern))
+
+    return self.__scandir(remote_path, raw_entries)
+
+  def __scandir_raw(self, remote_path, pattern):
+    if pattern is not None and '[' not in pattern:
+      raw_entries = self._scandir_pattern(remote_path, pattern)
+
+      if raw_entries is not None:
+        return raw_entries
+
+    return self._scandir(remote_path)
+
+  def __scandir_unchecked(self, remote_path):
+    '''Scans a directory, which is already known to be a directory, without any validation.'''
+    return self.__scandir(remote_path, self._scandir(remote_path))
+
+  def __scandir(self, remote_path, raw_entries):
+    for name, raw_lstat in raw_entries:
+      if name in ('.', '..'):
+        continue
+
+      path = os.path.join(remote_path, name)
+      entry = p_dir_entry(self, name, path, _stat_unpack(raw_lstat))
+
+      if self.__mcache is not None:
+        self.__mcache.put('lexists', path, True)
+        self.__mcache.put('lstat', path, raw_lstat)
+
+        if not entry.is_symlink():
+          self.__mcache.put('exists', path, True)
+          self.__mcache.put('stat', path, raw_lstat)
+          self.__mcache.put('isdir', path, entry.is_dir())
+
+      yield entry
+
+
+  def walk(self, top: str, topdown: bool = True, onerror=None, follow_symlinks: bool = False, workers: int = 1, ordered: bool = True) -> Iterator[Tuple[str, List[str], List[str]]]:
+    '''
+    Public method which generates the file names of a remote directory tree (including hidden files) in the same way as os.walk.
+    For each directory in the tree rooted at top (including top itself), it yields a 3-tuple (dirpath, dirnames, filenames).
+
+    Every directory is listed by a single scandir call and the tree is traversed iteratively, so only listings of directories on the current path (and their pending siblings) are held in memory.
+
+    Args:
+      top: The remote path of the root of the tree.
+      topdown: If True, a directory is yielded before its subdirectories and the caller can prune the traversal by modifying dirnames in place. Otherwise, it is yielded after them.
+      onerror: A function, which is called with the exception, if a directory can't be listed. The traversal continues afterwards, unless the function raises. If None, the errors are ignored.
+      follow_symlinks: If True, symbolic links to directories are reported in dirnames and traversed. Otherwise, all symbolic links are reported in filenames (and they are never resolved).
+      workers: The number of directories listed concurrently. If it is greater than 1, the listings are done by worker threads over cloned connections (see clone and PWalker), which are closed, when the walk finishes.
+      ordered: If False (and workers is greater than 1), directories are yielded as soon as they are listed instead of in the order of a sequential walk.
+
+    Returns:
+      An iterator of tuples (dirpath, dirnames, filenames).
+
+    '''
+    logging.debug(f"Walking remote tree {top} (topdown={topdown}, follow_symlinks={follow_symlinks}, workers={workers}).")
+
+    top = path_normalize(top)
+
+    for dirpath, dirs, files in self.__walk(top, topdown, onerror, follow_symlinks, workers, ordered):
+      dirnames = [entry.name for entry in dirs]
+      yield dirpath, dirnames, [entry.name for entry in files]
+
+      if topdown:
+        # The caller may have pruned dirnames.
+        by_name = {entry.name: entry for entry in dirs}
+        dirs[:] = [by_name[name] for name in dirnames if name in by_name]
+
+    logging.debug(f"Walking remote tree {top} is completed.")
+
+  def __walk(self, top, topdown, onerror, follow_symlinks, workers=1, ordered=True):
+    '''The traversal behind walk, which yields tuples (dirpath, dirs, files) of p_dir_entry lists.
+    If topdown is True, the subdirectories are taken from dirs after the tuple is yielded, so the list can be pruned in place.'''
+    if workers > 1:
+      yield from self.__walk_parallel(top, topdown, onerror, follow_symlinks, workers, ordered)
+      return
+
+    # The stack contains paths of directories to list and (bottom up only) listed directories waiting for their subdirectories.
+    stack = [top]
+    first = True
+
+    while stack:
+      item = stack.pop()
+
+      if not isinstance(item, str):
+        yield item
+        continue
+
+      try:
+        if first:
+          self.__validated(lambda: self.__check_is_folder(item), lambda: None)
+
+        dirs, files = self.__walk_listing(item, follow_symlinks)
+
+      except Exception as e:
+        if onerror is not None:
+          onerror(e)
+        continue
+
+      finally:
+        first = False
+
+      if topdown:
+        yield item, dirs, files
+      else:
+        stack.append((item, dirs, files))
+
+      stack.extend(entry.path for entry in reversed(dirs))
+
+  def __walk_parallel(self, top, topdown, onerror, follow_symlinks, workers, ordered):
+    try:
+      self.__validated(lambda: self.__check_is_folder(top), lambda: None)
+
+    except Exception as e:
+      if onerror is not None:
+        onerror(e)
+      return
+
+    with self.__worker_connections(workers) as connections:
+      if not connections:
+        logging.debug(f"No worker connection is available, walking {top} sequentially.")
+        yield from self.__walk(top, topdown, onerror, follow_symlinks)
+        return
+
+      listers = [lambda remote_path, c=c: c.__walk_listing(remote_path, follow_symlinks) for c in connections]
+      yield from PWalker(listers, ordered=ordered).walk(top, topdown, onerror)
+
+  def __walk_listing(self, remote_path, follow_symlinks):
+    '''Lists a directory, which is supposed to be a directory, and splits its entries to lists of directories and other files.'''
+    dirs = []
+    files = []
+
+    for entry in self.__scandir_unchecked(remote_path):
+      if entry.is_dir(follow_symlinks=follow_symlinks):
+        dirs.append(entry)
+      else:
+        files.append(entry)
+
+    return dirs, files
+
+  @contextlib.contextmanager
+  def __worker_connections(self, workers):
+    '''A context manager, which provides connections for worker threads and releases them at the end.
+    If the connection is a member of a PConnectionPool, free connections of the pool are used (possibly fewer than workers, even none). Otherwise, the connection is cloned.'''
+    logging.debug(f"Opening {workers} worker connections.")
+
+    pool = self.__pool
+    connections = []
+    try:
+      for i in range(workers):
+        if pool is None:
+          connections.append(self.clone())
+          continue
+
+        connection = pool.checkout(block=False)
+        if connection is None:
+          break
+        connections.append(connection)
+
+      yield connections
+
+    finally:
+      for connection in connections:
+        if pool is None:
+          connection.close()
+        else:
+          pool.checkin(connection)
+
+  def _attach_pool(self, pool, metadata_cache=None):
+    '''Marks the connection as a member of a PConnectionPool, so worker connections (see walk) are taken from the pool instead of being cloned. It is called by PConnectionPool.
+    Members of a pool share one metadata cache, so a change done through one of them isn't hidden from the others by stale entries.
+
+    Args:
+      pool: The pool.
+      metadata_cache: The metadata cache of other members of the pool. If None, the connection keeps its own cache.
+
+    Returns:
+      The metadata cache used by the connection (None, if it is disabled).
+    '''
+    self.__pool = pool
+
+    if metadata_cache is not None and self.__mcache is not None:
+      self.__mcache = metadata_cache
+
+    return self.__mcache
+
+  def find(self, remote_path: str, child_first: bool = False, workers: int = 1) -> List[str]:
     '''
     A public method which returns DFS (depth-first search) of remote_path including hidden files. It never returns '.' or '..'.
+    Symbolic links are never followed.
 
     Args:
       child_first: If True, childs of a directory will be returned before the directory itself.
+      workers: The number of directories listed concurrently (see walk).
 
     Returns:
       The result of DFS as a list of remote_paths.
     
+    '''
+    return list(self.ifind(remote_path, child_first, workers))
+
+  def ifind(self, remote_path: str, child_first: bool = False, workers: int = 1) -> Iterator[str]:
+    '''
+    A public method, which does the same as find, but it returns a generator instead of a list. It can be used for trees, which are too large to be held in memory.
+
+    Args:
+      child_first: If True, childs of a directory will be returned before the directory itself.
+      workers: The number of directories listed concurrently (see walk).
+
+    Returns:
+      An iterator of remote_paths in DFS order.
+
     '''
     logging.debug(f"Finding (making a tree) of file {remote_path}.")
 
     remote_path = path_normalize(remote_path)
     self.__check_file_existance(remote_path)
 
-    if self._isdir(remote_path):
-      ret = []
-      for f in self.xls(remote_path):
+    if not self.__is_real_dir(remote_path):
+      yield remote_path
+
+    else:
+      for dirpath, dirs, files in self.__walk(remote_path, not child_first, self.__raise, False, workers):
         if not child_first:
-          ret.append(remote_path)
+          yield dirpath
 
-        ret.extend( dfs_find(self, f) )
+        for entry in files:
+          yield entry.path
 
         if child_first:
-          ret.append(remote_path)
-        
-    else:
-      return [remote_path]
+          yield dirpath
+
+    logging.debug(f"Finding (making a tree) of file {remote_path} is completed.")
+
+  @staticmethod
+  def __raise(e):
+    raise e
+
+  def __is_real_dir(self, remote_path):
+    '''Returns True, if remote_path is a directory, which isn't a symlink.'''
+    mode = _stat_unpack(self.__lstat(remote_path)).st_mode
+    if mode is None:
+      return self.__isdir(remote_path)
+
+    return stat.S_ISDIR(mode)
 
   def mkdir(self, remote_path: str):
     '''
@@ -621,10 +1603,11 @@ class PConnection(ABC):
     remote_path = path_normalize(remote_path)
     dirname, _ = os.path.split(remote_path)
 
-    self.__check_is_folder(dirname)
-    self.__check_file_nonexistance(remote_path)
+    def validation():
+      self.__check_is_folder(dirname)
+      self.__check_file_nonexistance(remote_path)
 
-    self._mkdir(remote_path)
+    self.__validated(validation, lambda: self.__mkdir(remote_path))
 
     logging.debug(f"Making a directory file {remote_path} is completed.")
 
@@ -651,12 +1634,13 @@ class PConnection(ABC):
     logging.debug(f"Removing remote empty directory file {remote_path}.")
 
     remote_path = path_normalize(remote_path)
-    self.__check_is_folder(remote_path)
+    def validation():
+      self.__check_is_folder(remote_path)
 
-    if not self.ls(remote_path) == []:
-      raise InterruptedError("Remote folder is not empty.")
+      if not self.ls(remote_path) == []:
+        raise InterruptedError("Remote folder is not empty.")
 
-    self._rmdir(remote_path)
+    self.__validated(validation, lambda: self.__rmdir(remote_path))
 
     logging.debug(f"Removing remote empty directory file {remote_path} is completed.")
 
@@ -666,10 +1650,11 @@ class PConnection(ABC):
     old_name = path_normalize(old_name)
     new_name = path_normalize(new_name)
 
-    self.__check_file_existance(old_name)
-    self.__check_file_nonexistance(new_name)
+    def validation():
+      self.__check_file_existance(old_name)
+      self.__check_file_nonexistance(new_name)
 
-    self._rename(old_name, new_name)
+    self.__validated(validation, lambda: self.__rename(old_name, new_name))
 
     logging.debug(f"Renaming remote file {old_name} to {new_name} is completed.")
 
@@ -677,16 +1662,17 @@ class PConnection(ABC):
   def fmv(self, old_name: str, new_name: str):
     logging.debug(f"Moving remote non-directory file {old_name} to a remote non-directory file {new_name}.")
 
-    self.__check_not_folder(old_name)
-    self.__check_potencial_not_folder(old_name)
+    old_name = path_normalize(old_name)
+    new_name = path_normalize(new_name)
 
-    if self.exists(new_name):
-      self.rm(new_name)
-    
-    self.rename(old_name, new_name)
+    def validation():
+      self.__check_not_folder(old_name)
+      self.__check_potencial_not_folder(new_name)
+
+    self.__validated(validation, lambda: self.__replace(old_name, new_name))
 
     logging.debug(f"Moving remote non-directory file {old_name} to a remote non-directory file {new_name} is completed.")
-  
+
   # mv to dir
   def dmv(self, old_names: List[str], target_dir: str):
     logging.debug(f"Moving remote file {old_names} inside a remote target directory {target_dir}.")
@@ -694,33 +1680,39 @@ class PConnection(ABC):
     old_names = [*map(path_normalize, old_names)]
     target_dir = path_normalize(target_dir)
     
-    self.__check_is_folder(target_dir)
-    for name in old_names:
-      self.__check_file_existance(name)   
+    if not self.__skip_validation:
+      self.__check_is_folder(target_dir)
+      for name in old_names:
+        self.__check_file_existance(name)   
+
+    self.__dmv([(name, self.isdir(name)) for name in old_names], target_dir)
 
-    target_dir_ls = self.ls(target_dir)
+    logging.debug(f"Moving remote files {old_names} inside a remote directory {target_dir} is completed.")
 
-    for name in old_names:
+  def __dmv(self, sources, target_dir):
+    '''Moves sources (pairs of a path and whether it is a directory) inside target_dir. Types of files inside merged directories are taken from listings.'''
+    target_entries = {entry.name: entry for entry in self.__scandir_unchecked(target_dir)}
+
+    for name, name_isdir in sources:
       dirname, basename = os.path.split(name)
       newname = os.path.join(target_dir, basename)
+      target = target_entries.get(basename)
 
-      if self.isdir(name):
-        if basename in target_dir_ls:
-          if not self.isdir(newname):
+      if name_isdir:
+        if target is not None:
+          if not target.is_dir():
             raise InterruptedError(f"Cannot overwrite remote non-directory {newname} with remote directory {name}.")
-          self.dmv(self.xls(name), newname)
+          self.__dmv([(entry.path, entry.is_dir()) for entry in self.__scandir_unchecked(name)], newname)
 
         else:
           self.rename(name, newname)          
      
       else:
-        if basename in target_dir_ls:
-          if self.isdir(newname):
+        if target is not None:
+          if target.is_dir():
             raise InterruptedError(f"Cannot overwrite remote directory {newname} with remote non-directory {name}.")
         
-        self.fmv(name, newname)
-
-    logging.debug(f"Moving remote files {old_names} inside a remote directory {new_name} is completed.")
+        self.__replace(name, newname)
 
 
   def mv(self, old_names: List[str], new_name: str):
@@ -749,61 +1741,88 @@ class PConnection(ABC):
   def fcp(self, old_name: str, new_name: str):
     logging.debug(f"Copying remote non-directory file {old_name} to a remote non-directory file {new_name}.")
 
-    self.__check_not_folder(old_name)
-    self.__check_potencial_not_folder(old_name)
-    
-    with tempfile.NamedTemporaryFile() as _tmp_file:
-      tmp_file = _tmp_file.name
-      self.pull(old_name, tmp_file)
-    
-      if self.exists(new_name):
-        self.rm(new_name)
-      self.push(tmp_file, new_name)
+    old_name = path_normalize(old_name)
+    new_name = path_normalize(new_name)
+
+    def validation():
+      self.__check_not_folder(old_name)
+      self.__check_potencial_not_folder(new_name)
+
+    self.__validated(validation, lambda: self.__copy_file(old_name, new_name))
 
     logging.debug(f"Copying remote non-directory file {old_name} to a remote non-directory file {new_name} is completed.")
 
+  def __copy_file(self, old_name, new_name):
+    '''Copies a nondirectory file without any validation. Both files are in the remote encoding, so no transcoding is done.'''
+    if self.__direct_write:
+      self.__copy(old_name, new_name)
+
+    else:
+      tmp_file = self.__infolder_tmp_file(new_name)
+
+      try:
+        self.__copy(old_name, tmp_file)
+        self.__replace(tmp_file, new_name)
+      except BaseException:
+        self.__remove_remote_tmp_file(tmp_file)
+        raise
+
   def dcp(self, old_names: List[str], target_dir: str, recursive: bool = False):
     logging.debug(f"Copying remote file {old_names} inside a remote directory {target_dir}. (recursive={recursive})")
 
     old_names = [*map(path_normalize, old_names)]
     target_dir = path_normalize(target_dir)
 
-    self.__check_is_folder(target_dir)
-    for name in old_names:
-      if not recursive:
-        self.__check_not_folder(name)
-      else:
-        self.__check_file_existance(name)   
+    if not self.__skip_validation:
+      self.__check_is_folder(target_dir)
+      for name in old_names:
+        if not recursive:
+          self.__check_not_folder(name)
+        else:
+          self.__check_file_existance(name)   
     
-    target_dir_ls = self.ls(target_dir)
+    if recursive:
+      sources = [(name, self.isdir(name)) for name in old_names]
+    else:
+      sources = [(name, False) for name in old_names]
+
+    self.__dcp(sources, target_dir, recursive)
 
+    logging.debug(f"Copying remote file {old_names} inside a remote directory {target_dir} is completed. (recursive={recursive})")
+
+
+
+  def __dcp(self, sources, target_dir, recursive, target_entries=None):
+    '''Copies sources (pairs of a path and whether it is a directory) inside target_dir. Types of files inside copied directories are taken from listings.'''
+    if target_entries is None:
+      target_entries = {entry.name: entry for entry in self.__scandir_unchecked(target_dir)}
 
-    for name in old_names:
+    for name, name_isdir in sources:
       dirname, basename = os.path.split(name)
       newname = os.path.join(target_dir, basename)
+      target = target_entries.get(basename)
 
       logging.debug(f"New name of remote file {name} will be {newname}.")
 
-      if recursive and self.isdir(name):
-        if basename in target_dir_ls:
-          if not self.isdir(newname):
+      if recursive and name_isdir:
+        if target is not None:
+          if not target.is_dir():
             raise InterruptedError(f"Cannot overwrite remote non-directory {newname} with remote directory {name}.")
 
+          newname_entries = None
+
         else:
           self.mkdir(newname)   
+          newname_entries = {}
        
-        self.dcp(self.xls(name), newname)
+        self.__dcp([(entry.path, entry.is_dir()) for entry in self.__scandir_unchecked(name)], newname, recursive, newname_entries)
      
       else:
-        if basename in target_dir_ls:
-          if self.isdir(newname):
+        if target is not None:
+          if target.is_dir():
             raise InterruptedError(f"Cannot overwrite remote directory {newname} with remote non-directory {name}.")
         
-        self.fcp(name, newname)
-
-    logging.debug(f"Copying remote file {old_names} inside a remote directory {target_dir} is completed. (recursive={recursive})")
-
-
+        self.__copy_file(name, newname)
 
   def cp(self, old_names: List[str], new_name: str, recursive: bool = False):
     logging.debug(f"Copying remote files {old_names} to destination {new_name} (recursive={recursive}).")
@@ -829,9 +1848,9 @@ class PConnection(ABC):
     logging.debug(f"Unlinking remote non-directory file {remote_path}.")     
 
     remote_path = path_normalize(remote_path)
-    self.__check_not_folder(remote_path)
-
-    self._unlink(remote_path)
+    self.__validated(
+      lambda: self.__check_not_folder(remote_path),
+      lambda: self.__unlink(remote_path))
 
     logging.debug(f"Unlinking remote non-directory file {remote_path} is completed.")     
 
@@ -847,28 +1866,43 @@ class PConnection(ABC):
     remote_path = path_normalize(remote_path)
 
     if self.exists(remote_path):
-      ret = self._isdir(remote_path)
+      ret = self.__isdir(remote_path)
     else:
       ret = False
 
     logging.debug(f"Remote file {remote_path} is a directory: {ret}") 
     return ret    
 
-  def rm(self, remote_path: str, recursive: bool = False):
+  def rm(self, remote_path: str, recursive: bool = False, workers: int = 1):
+    '''
+    Public method which deletes a remote file. If recursive is True, directories are deleted together with their content.
+
+    Args:
+      remote_path: The remote path of a file to delete.
+      recursive: Enables deleting of directories.
+      workers: The number of directories listed concurrently, when a directory is deleted (see walk).
+
+    '''
     logging.debug(f"Deleting remote non-directory file {remote_path} (recursive={recursive}).")     
 
     remote_path = path_normalize(remote_path)
-    self.__check_file_existance(remote_path)
 
     if not recursive:
       self.unlink(remote_path)
     
     else:
-      for f in self.find(remote_path, child_first=True):
-        if self.isdir(f):
-          self.rmdir(f)
-        else: 
-          self.unlink(f)
+      self.__check_file_existance(remote_path)
+
+      if not self.__is_real_dir(remote_path):
+        self.__unlink(remote_path)
+
+      else:
+        # The types of all files are known from the listings, so no further checks are needed.
+        for dirpath, dirs, files in self.__walk(remote_path, False, self.__raise, False, workers):
+          for entry in files:
+            self.__unlink(entry.path)
+
+          self.__rmdir(dirpath)
 
     logging.debug(f"Deleting remote non-directory file {remote_path} is completed (recursive={recursive}).")     
        
@@ -877,14 +1911,26 @@ class PConnection(ABC):
     logging.debug(f"Listing remote directory file {remote_path}.")     
 
     remote_path = path_normalize(remote_path)
-    self.__check_file_existance(remote_path)
-    
-    ret = []
-    
-    if self.isdir(remote_path):
-      ret = self.listdir(remote_path)
+
+    if self.__skip_validation:
+      try:
+        ret = self.__listdir(remote_path)
+
+      except Exception:
+        # Listing fails also for non-directory files, which are listed by their name.
+        self.__check_file_existance(remote_path)
+        if self.__isdir(remote_path):
+          raise
+
+        ret = [os.path.basename(remote_path)]
+
     else:
-      ret = [os.path.basename(remote_path)]
+      self.__check_file_existance(remote_path)
+      
+      if self.isdir(remote_path):
+        ret = self.listdir(remote_path)
+      else:
+        ret = [os.path.basename(remote_path)]
 
     logging.debug(f"Remote directory file {remote_path} contains {ret}.")
     return ret
@@ -901,10 +1947,115 @@ class PConnection(ABC):
     else: 
       return [remote_path]
 
+  def __read_raw(self, remote_path):
+    return self.__validated(
+      lambda: self.__check_not_folder(remote_path),
+      lambda: self._read_bytes(remote_path))
+
+  def __write_raw(self, remote_path, data):
+    def action():
+      if self.__direct_write:
+        self.__invalidate(remote_path)
+        self._write_bytes(remote_path, data)
+        self.__invalidate(remote_path, exists=True, lexists=True, isdir=False)
+
+      else:
+        tmp_file = self.__infolder_tmp_file(remote_path)
+
+        try:
+          self.__invalidate(tmp_file)
+          self._write_bytes(tmp_file, data)
+          self.__invalidate(tmp_file, exists=True, lexists=True, isdir=False)
+
+          self.__replace(tmp_file, remote_path)
+        except BaseException:
+          self.__remove_remote_tmp_file(tmp_file)
+          raise
+
+    self.__validated(lambda: self.__check_potencial_not_folder(remote_path), action)
+
+  def __text_codec(self):
+    if self.__text_transmission:
+      return self.__remote_encoding, self.__remote_crlf
+    else:
+      return self.__local_encoding, self.__local_crlf
+
+  def read_bytes(self, remote_path: str) -> bytes:
+    """Reads whole content of a remote nondirectory file into memory. Suitable for small files, which don't need to be stored locally.
+    If text_transmission is enabled, the data are transcoded to local encoding and line endings.
+
+    Args:
+      remote_path: Path of a remote file.
+
+    Returns:
+      The content of the file.
+    """
+    logging.debug(f"Reading remote file {remote_path}.")
+
+    remote_path = path_normalize(remote_path)
+    data = self.__read_raw(remote_path)
+
+    transcoder = self.__transcoder(upload=False)
+    if transcoder is not None:
+      data = transcoder.transcode(data, final=True)
+
+    return data
+
+  def write_bytes(self, remote_path: str, data: bytes):
+    """Writes data from memory to a remote nondirectory file. If the file exists, it is overwritten.
+    If text_transmission is enabled, the data are transcoded to remote encoding and line endings. If direct_write is disabled, a temporary file is written first and then moved to remote_path.
+
+    Args:
+      remote_path: Path of a remote file.
+      data: The new content of the file.
+    """
+    logging.debug(f"Writing remote file {remote_path}.")
+
+    remote_path = path_normalize(remote_path)
+
+    transcoder = self.__transcoder(upload=True)
+    if transcoder is not None:
+      data = transcoder.transcode(data, final=True)
+
+    self.__write_raw(remote_path, data)
+
+  def read_text(self, remote_path: str) -> str:
+    """Reads whole content of a remote nondirectory text file into memory. The file is decoded using remote_encoding if text_transmission is enabled and using local_encoding otherwise. Line endings are translated to LF.
+
+    Args:
+      remote_path: Path of a remote file.
+
+    Returns:
+      The content of the file.
+    """
+    logging.debug(f"Reading remote text file {remote_path}.")
+
+    remote_path = path_normalize(remote_path)
+    encoding, _ = self.__text_codec()
+
+    with io.TextIOWrapper(io.BytesIO(self.__read_raw(remote_path)), encoding=encoding, newline=None) as text_file:
+      return text_file.read()
+
+  def write_text(self, remote_path: str, text: str):
+    """Writes a string to a remote nondirectory text file. If the file exists, it is overwritten. The string is encoded using remote_encoding and remote_crlf if text_transmission is enabled and using local_encoding and local_crlf otherwise.
+
+    Args:
+      remote_path: Path of a remote file.
+      text: The new content of the file.
+    """
+    logging.debug(f"Writing remote text file {remote_path}.")
+
+    remote_path = path_normalize(remote_path)
+    encoding, crlf = self.__text_codec()
+
+    if crlf:
+      text = text.replace('\n', '\r\n')
+
+    self.__write_raw(remote_path, text.encode(encoding))
+
   def touch(self, remote_path: str):
-    with tempfile.NamedTemporaryFile() as _tmp_file:
-      tmp_file = _tmp_file.name
-      self.push(tmp_file, remote_path)    
+    remote_path = path_normalize(remote_path)
+    self.__write_raw(remote_path, b'')
   
   def __enter__(self):
       return self
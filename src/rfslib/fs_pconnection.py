@@ -1,6 +1,65 @@
 from rfslib import abstract_pconnection, pconnection_settings
 
-import os, sys, shutil
+import os, sys, shutil, errno
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+
+
+# _IOW(0x94, 9, int) of linux/fs.h
+_FICLONE = 0x40049409
+# Errors, which mean that a copy method isn't supported for the pair of files (so the next one should be tried).
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.EINVAL, errno.ENOSYS, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOTTY, errno.EBADF}
+_COPY_BLOCK_SIZE = 1024 ** 3
+_COPY_BUFFER_SIZE = 1024 ** 2
+
+
+def _fast_copy(src_path, dst_path):
+  '''Copies the content of a file (permission bits and other metadata aren't copied). The fastest method supported by the platform and the filesystems is used:
+  a reflink (FICLONE), copy_file_range, sendfile and a buffered copy as the last resort. Each method continues, where the previous one stopped.'''
+  with open(src_path, 'rb', buffering=0) as src, open(dst_path, 'wb', buffering=0) as dst:
+    src_fd = src.fileno()
+    dst_fd = dst.fileno()
+
+    if fcntl is not None and sys.platform.startswith('linux'):
+      try:
+        # The files share the extents on copy-on-write filesystems (eg. Btrfs, XFS), no data are copied.
+        fcntl.ioctl(dst_fd, _FICLONE, src_fd)
+        return
+      except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+          raise
+
+    for copy_block in (_copy_file_range_block, _sendfile_block):
+      try:
+        while copy_block(src_fd, dst_fd):
+          pass
+        return
+
+      except OSError as e:
+        if e.errno not in _UNSUPPORTED_ERRNOS:
+          raise
+
+    shutil.copyfileobj(src, dst, _COPY_BUFFER_SIZE)
+
+
+def _copy_file_range_block(src_fd, dst_fd):
+  if not hasattr(os, 'copy_file_range'):
+    raise OSError(errno.ENOSYS, "copy_file_range is not available")
+
+  # The data don't pass through the user space, NFS 4.2 and SMB servers copy them on the server side.
+  return os.copy_file_range(src_fd, dst_fd, _COPY_BLOCK_SIZE)
+
+
+def _sendfile_block(src_fd, dst_fd):
+  if not sys.platform.startswith('linux'):
+    # Elsewhere, the target of sendfile must be a socket.
+    raise OSError(errno.ENOSYS, "sendfile to a file is not available")
+
+  return os.sendfile(dst_fd, src_fd, None, _COPY_BLOCK_SIZE)
+
 
 class FsPConnection(abstract_pconnection.PConnection):
   '''Class for operating with local filesystem. Public interface with an exception of __init__ and close is inherited from PConnection.'''
@@ -15,18 +74,37 @@ class FsPConnection(abstract_pconnection.PConnection):
 
   def close(self):
     pass
+
+  def clone(self):
+    return type(self)(self.get_settings())
   
   def _listdir(self, remote_path):
     return os.listdir(remote_path)
 
+  def _scandir(self, remote_path):
+    with os.scandir(remote_path) as entries:
+      return [(entry.name, entry.stat(follow_symlinks=False)) for entry in entries]
+
   def _rename(self, old_name, new_name):
     os.rename(old_name, new_name) 
 
+  def _replace(self, old_name, new_name):
+    os.replace(old_name, new_name)
+
   def _push(self, local_path, remote_path):
-    shutil.copy(local_path, remote_path)
+    _fast_copy(local_path, remote_path)
 
   def _pull(self, remote_path, local_path):
-    shutil.copy(remote_path, local_path)
+    _fast_copy(remote_path, local_path)
+
+  def _copy(self, old_name, new_name):
+    _fast_copy(old_name, new_name)
+
+  def _open(self, remote_path, mode):
+    return open(remote_path, mode)
+
+  def _can_write_at_offset(self):
+    return True
   
   def _isdir(self, remote_path):
     return os.path.isdir(remote_path)
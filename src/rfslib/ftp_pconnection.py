@@ -1,6 +1,7 @@
 from rfslib import abstract_pconnection, pconnection_settings
 import ftplib
 import ftputil
+import ftputil.error
 
 from os.path import split
 
@@ -25,6 +26,10 @@ class FtpPConnection(abstract_pconnection.PConnection):
     '''
     super().__init__(settings)
 
+    # Arguments needed to open the same connection again by clone.
+    self.__connect_args = dict(host=host, username=username, password=password, port=port, tls=tls, passive_mode=passive_mode,
+      debug_level=debug_level, connection_encoding=connection_encoding, dont_use_list_a=dont_use_list_a)
+
     if tls:
       factory_b_class = ftplib.FTP_TLS
     else:
@@ -44,18 +49,50 @@ class FtpPConnection(abstract_pconnection.PConnection):
 
   def close(self):
     self.__ftp.close()
+
+  def clone(self):
+    return FtpPConnection(self.get_settings(), **self.__connect_args)
   
   def _listdir(self, remote_path):
     return self.__ftp.listdir(remote_path)
 
+  def _scandir(self, remote_path):
+    names = self.__ftp.listdir(remote_path)
+
+    # ftputil stores attributes parsed from the listing in its stat cache, so lstat doesn't send any further command.
+    return [(name, self.__ftp.lstat(self.__ftp.path.join(remote_path, name))) for name in names]
+
   def _rename(self, old_name, new_name):
     self.__ftp.rename(old_name, new_name) 
 
+  def _replace(self, old_name, new_name):
+    # Most of servers overwrite an existing target of RNTO, so the rename is tried first.
+    try:
+      self.__ftp.rename(old_name, new_name)
+      return
+    except ftputil.error.PermanentError as e:
+      rename_error = e
+
+    # The target must not be deleted, if the rename failed, because the source is missing.
+    if not self._lexists(old_name):
+      raise rename_error
+
+    # The target is deleted without checking its existence, the check would cost a listing of the folder.
+    try:
+      self.__ftp.remove(new_name)
+    except ftputil.error.PermanentError:
+      raise rename_error
+
+    self.__ftp.rename(old_name, new_name)
+
   def _push(self, local_path, remote_path):
     self.__ftp.upload(local_path, remote_path)
 
   def _pull(self, remote_path, local_path):
     self.__ftp.download(remote_path, local_path)
+
+  def _open(self, remote_path, mode):
+    return self.__ftp.open(remote_path, mode)
   
   def _isdir(self, remote_path):
     return self.__ftp.path.isdir(remote_path)
@@ -0,0 +1,281 @@
+import contextlib
+import logging
+import threading
+import time
+
+from rfslib.abstract_pconnection import PConnection
+from rfslib.pstream import PRemoteWriter
+
+
+class _PHeldIterator():
+  '''An iterator, which holds a connection checked out of a pool, until it is exhausted, closed or garbage collected.'''
+
+  def __init__(self, iterator, release):
+    self.__iterator = iterator
+    self.__release = release
+
+  def __iter__(self):
+    return self
+
+  def __next__(self):
+    if self.__release is None:
+      raise StopIteration
+
+    try:
+      return next(self.__iterator)
+
+    except StopIteration:
+      self.__finish(False)
+      raise
+
+    except BaseException:
+      self.__finish(True)
+      raise
+
+  def __finish(self, suspicious):
+    release = self.__release
+    if release is None:
+      return
+
+    self.__release = None
+
+    close = getattr(self.__iterator, 'close', None)
+    try:
+      if close is not None:
+        close()
+    finally:
+      release(suspicious)
+
+  def close(self):
+    '''Stops the iteration and returns the connection to the pool.'''
+    self.__finish(False)
+
+  def __del__(self):
+    self.close()
+
+
+class PConnectionPool():
+  '''Thread-safe pool of connections to the same remote storage. A single PConnection must not be used by more threads at once, the pool lets many threads work with the storage concurrently.
+
+  Connections are opened lazily by a factory (up to max_size of them) and reused afterwards. Connections idle for longer than max_idle are closed (except of min_size of them) and connections idle for longer than check_after (or returned after an exception) are checked by PConnection.is_alive before they are handed out again.
+
+  The pool exposes the public API of PConnection. Each call is dispatched to a free connection, which is returned to the pool, when the call finishes. Iterators (eg. walk) and streams (open) hold their connection until they are exhausted or closed.
+  Members of the pool take their worker connections (see PConnection.walk) from the pool and share one metadata cache (see pconnection_settings.metadata_cache).'''
+
+  def __init__(self, factory, min_size: int = 1, max_size: int = 8, max_idle: float = 300.0, check_after: float = 30.0):
+    '''The constructor of PConnectionPool. Opens min_size connections.
+
+    Args:
+      factory: A function without arguments, which opens a new connection (eg. lambda: SftpPConnection(settings, host, username)).
+      min_size: The number of connections, which are kept open, even if they are idle.
+      max_size: The maximal number of open connections. If all of them are checked out, checkout waits for a free one.
+      max_idle: Number of seconds, after which an idle connection is closed.
+      check_after: Number of seconds of idleness, after which a connection is checked before it is handed out.
+    '''
+    if not 0 <= min_size <= max_size or max_size < 1:
+      raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}.")
+
+    self.__factory = factory
+    self.__min_size = min_size
+    self.__max_size = max_size
+    self.__max_idle = max_idle
+    self.__check_after = check_after
+
+    self.__condition = threading.Condition()
+    # Tuples (connection, last_used, suspicious); the most recently used connections are at the end.
+    self.__idle = []
+    self.__size = 0
+    self.__closed = False
+    # The metadata cache shared by all members (see PConnection._attach_pool).
+    self.__mcache = None
+
+    for i in range(min_size):
+      self.__size += 1
+      self.__idle.append((self.__open(), time.monotonic(), False))
+
+  def __open(self):
+    logging.debug("Opening a new connection of the pool.")
+
+    try:
+      connection = self.__factory()
+    except BaseException:
+      with self.__condition:
+        self.__size -= 1
+        self.__condition.notify()
+      raise
+
+    with self.__condition:
+      mcache = connection._attach_pool(self, self.__mcache)
+      if self.__mcache is None:
+        self.__mcache = mcache
+
+    return connection
+
+  def __discard(self, connection):
+    try:
+      connection.close()
+    except Exception as e:
+      logging.debug(f"Closing of a discarded connection failed: {e}")
+
+    with self.__condition:
+      self.__size -= 1
+      self.__condition.notify()
+
+  def __expired(self):
+    '''Removes connections idle for too long from the pool and returns them. It must be called with the lock held.'''
+    expired = []
+    deadline = time.monotonic() - self.__max_idle
+
+    while self.__idle and self.__size - len(expired) > self.__min_size and self.__idle[0][1] < deadline:
+      expired.append(self.__idle.pop(0)[0])
+
+    return expired
+
+  def checkout(self, timeout: float = None, block: bool = True) -> PConnection:
+    '''Takes a free connection out of the pool. It must be returned by checkin afterwards.
+
+    Args:
+      timeout: The maximal number of seconds to wait for a free connection. If None, it waits without limit.
+      block: If False and no connection is available immediately, None is returned.
+
+    Returns:
+      A connection, which is used exclusively by the caller.
+
+    Raises:
+      TimeoutError: No connection was available in time.
+    '''
+    deadline = None if timeout is None else time.monotonic() + timeout
+
+    while True:
+      with self.__condition:
+        grow = False
+        connection = None
+        expired = []
+
+        while True:
+          if self.__closed:
+            raise ValueError("The pool is closed.")
+
+          expired.extend(self.__expired())
+          if self.__idle:
+            connection, last_used, suspicious = self.__idle.pop()
+            break
+
+          if self.__size < self.__max_size:
+            self.__size += 1
+            grow = True
+            break
+
+          if not block:
+            break
+
+          remaining = None if deadline is None else deadline - time.monotonic()
+          if remaining is not None and remaining <= 0:
+            raise TimeoutError(f"No connection of the pool became free in {timeout} s.")
+
+          self.__condition.wait(remaining)
+
+      for old in expired:
+        logging.debug("Closing a connection of the pool, which was idle for too long.")
+        self.__discard(old)
+
+      if grow:
+        return self.__open()
+
+      if connection is None:
+        return None
+
+      if suspicious or time.monotonic() - last_used > self.__check_after:
+        if not connection.is_alive():
+          logging.debug("Discarding a broken connection of the pool.")
+          self.__discard(connection)
+          continue
+
+      return connection
+
+  def checkin(self, connection: PConnection, suspicious: bool = False):
+    '''Returns a connection taken by checkout to the pool.
+
+    Args:
+      connection: The connection.
+      suspicious: If True, the connection will be checked before it is handed out again (eg. because the last operation failed).
+    '''
+    with self.__condition:
+      if not self.__closed:
+        self.__idle.append((connection, time.monotonic(), suspicious))
+        self.__condition.notify()
+        return
+
+    self.__discard(connection)
+
+  @contextlib.contextmanager
+  def connection(self, timeout: float = None):
+    '''A context manager, which checks out a connection and returns it back to the pool at the end.
+
+    Args:
+      timeout: See checkout.
+    '''
+    connection = self.checkout(timeout)
+
+    try:
+      yield connection
+    except BaseException:
+      self.checkin(connection, suspicious=True)
+      raise
+    else:
+      self.checkin(connection)
+
+  def close(self):
+    '''Closes all idle connections. Checked out connections are closed, when they are returned.'''
+    with self.__condition:
+      self.__closed = True
+      idle = [connection for connection, _, _ in self.__idle]
+      self.__idle.clear()
+      self.__condition.notify_all()
+
+    for connection in idle:
+      self.__discard(connection)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    self.close()
+
+  def __len__(self):
+    '''Returns the number of open connections (idle and checked out).'''
+    with self.__condition:
+      return self.__size
+
+  def __getattr__(self, name):
+    method = getattr(PConnection, name, None)
+    if name.startswith('_') or name in ('clone', 'set_settings') or not callable(method):
+      raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    def dispatched(*args, **kwargs):
+      return self.__dispatch(name, args, kwargs)
+
+    dispatched.__name__ = name
+    dispatched.__doc__ = method.__doc__
+    return dispatched
+
+  def __dispatch(self, name, args, kwargs):
+    connection = self.checkout()
+
+    def release(suspicious=False):
+      self.checkin(connection, suspicious)
+
+    try:
+      result = getattr(connection, name)(*args, **kwargs)
+    except BaseException:
+      release(True)
+      raise
+
+    if name == 'open':
+      return PRemoteWriter(result, release, lambda: release(True))
+
+    if hasattr(result, '__next__'):
+      return _PHeldIterator(result, release)
+
+    release()
+    return result
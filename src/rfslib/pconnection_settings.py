@@ -18,14 +18,27 @@ class pconnection_settings():
   '''Does remote files use CRLF? If True, it is supposed, they do. If False, it is supposed, they use LF.'''
 
   direct_write:bool = False
-  '''NOT IMPLEMENTED YET. If True, push will write output directly to file. If False all push operations on regular files will create firstly tmp file in target folder and then move result to file.'''
+  '''If True, push will write output directly to file. If False all push operations on regular files will create firstly tmp file in target folder and then move result to file.
+  Direct write saves several round trips per file, but a reader may see a partially written file and an interrupted push leaves the target file truncated.'''
 
   skip_validation:bool = False
-  '''NOT IMPLEMENTED YED. If True, all validations of input will be skipped. Undefined behavior may happen if input is wrong. Increses performance.'''
+  '''If True, all validations of input will be skipped and operations will be passed to the remote storage right away. If an operation fails, the validations are run afterwards, so the same exceptions are raised as if validations were enabled. Undefined behavior may happen if input is wrong (eg. a file may be overwritten). Increases performance.'''
 
   default_fmask:int = 0o0133
   '''If mode (permissions) of a nondirectory file can't be fetched, this value will be used instead of it.'''
   default_dmask:int = 0o0022
   '''If mode (permissions) of a directory can't be fetched, this value will be used instead of it.'''
 
+  metadata_cache:bool = False
+  '''If True, results of stat, lstat, exists, lexists and isdir are cached (including negative results) and reused by all validations. The cache is invalidated by all modifying operations of the connection, but changes done by other clients may stay unnoticed until the entry expires. Increases performance.'''
+  metadata_cache_ttl:float = 5.0
+  '''Number of seconds, after which an entry of the metadata cache expires.'''
+  metadata_cache_size:int = 4096
+  '''Maximal number of entries of the metadata cache. If it is exceeded, the least recently used entries are evicted.'''
 
+  chunked_transfer_workers:int = 1
+  '''If greater than 1, push and pull of large files split the file into ranges, which are transferred concurrently over this number of connections (the connection itself and cloned or pooled worker connections). Each range is written at its offset, so no stitching is needed. Each range is verified to be transferred whole and the size of the result is verified afterwards. It is used only if the protocol can write at offsets (SFTP, SMB and the local filesystem; not FTP).'''
+  chunked_transfer_threshold:int = 256 * 1024 * 1024
+  '''Minimal size of a file (in bytes), which is transferred in chunks (see chunked_transfer_workers).'''
+  chunked_transfer_chunk_size:int = 64 * 1024 * 1024
+  '''Size of a range (in bytes), which is transferred at once by a worker (see chunked_transfer_workers).'''
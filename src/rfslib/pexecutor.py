@@ -0,0 +1,108 @@
+import logging
+import queue
+import threading
+
+
+class PExecutor():
+  '''Runs a stream of tasks concurrently, each worker thread with its own resource (eg. a connection, which can't be shared between threads).
+
+  Tasks are taken lazily from an iterable through a bounded queue, so even a huge number of tasks doesn't fill the memory.
+  The first failure cancels all later tasks (in the order of the iterable), which haven't been started yet. Earlier tasks are still done, so the exception of the earliest failed task is raised (the same one as in a sequential run), when all running tasks finish.'''
+
+  def __init__(self, resources: list, queue_size: int = None):
+    '''The constructor of PExecutor.
+
+    Args:
+      resources: A list of resources, one for each worker thread. If there is only one resource, tasks are run in the calling thread.
+      queue_size: The maximal number of tasks waiting for a free worker. Defaults to 4 times the number of workers.
+    '''
+    self.__resources = resources
+
+    if queue_size is None:
+      queue_size = 4 * len(resources)
+    self.__queue_size = queue_size
+
+  def run(self, function, tasks) -> int:
+    '''Calls function(resource, task) for each task.
+
+    Args:
+      function: A function, which does a task using a resource of the worker.
+      tasks: An iterable of tasks.
+
+    Returns:
+      The number of done tasks.
+    '''
+    if len(self.__resources) == 1:
+      done = 0
+      for task in tasks:
+        function(self.__resources[0], task)
+        done += 1
+
+      return done
+
+    tasks_queue = queue.Queue(maxsize=self.__queue_size)
+    cancelled = threading.Event()
+    lock = threading.Lock()
+
+    failures = []
+    first_failure = None
+    done = 0
+
+    def work(resource):
+      nonlocal done, first_failure
+
+      while True:
+        item = tasks_queue.get()
+        if item is None:
+          return
+
+        index, task = item
+        with lock:
+          if first_failure is not None and index > first_failure:
+            continue
+
+        try:
+          function(resource, task)
+
+        except Exception as e:
+          with lock:
+            failures.append((index, e))
+            if first_failure is None or index < first_failure:
+              first_failure = index
+          cancelled.set()
+
+        else:
+          with lock:
+            done += 1
+
+    threads = [threading.Thread(target=work, args=(resource,), daemon=True) for resource in self.__resources]
+    for thread in threads:
+      thread.start()
+
+    try:
+      for item in enumerate(tasks):
+        if cancelled.is_set():
+          break
+
+        tasks_queue.put(item)
+
+    except BaseException:
+      cancelled.set()
+      raise
+
+    finally:
+      for thread in threads:
+        tasks_queue.put(None)
+
+      for thread in threads:
+        thread.join()
+
+    if failures:
+      failures.sort(key=lambda failure: failure[0])
+
+      for index, e in failures[1:]:
+        logging.debug(f"Task {index} failed as well: {e}")
+
+      raise failures[0][1]
+
+    return done
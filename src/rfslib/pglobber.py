@@ -1,179 +1,276 @@
-# Original source file - https://github.com/python/cpython/blob/3.9/Lib/glob.py
-# THIS IS UTTERLY PIGGY SOLUTION OF THE PROBLEM! DEBUGGING IS WELCOME.
-# Don't use anything else then glob function - YOU HAVE BEEN WARNED.
-"""Filename globbing utility."""
+'''Globbing of remote paths. It follows semantics of glob.glob of CPython (see https://github.com/python/cpython/blob/3.9/Lib/glob.py), but the pattern is compiled first, so the remote storage is listed only where it is needed.'''
 
 from os import path
-import re
 import fnmatch
-import sys
-
 import logging
+import re
+from typing import Iterator
 
 _magic_check = re.compile('([*?[])')
-_magic_check_bytes = re.compile(b'([*?[])')
+# The maximal number of matches of a pattern written to the log.
+_LOG_SAMPLE_SIZE = 10
+
+
+def _has_magic(s):
+  return _magic_check.search(s) is not None
+
+
+class _PGlobNode():
+  '''A compiled segment of a pattern (a part between slashes). Children of the node match the following segment.'''
+
+  def __init__(self, segment: str, recursive: bool):
+    self.segment = segment
+    self.children = {}
+
+    # '**' matches any number of directories (including none).
+    self.recursive = recursive and segment == '**'
+    self.literal = not self.recursive and not _has_magic(segment)
+    self.regex = None if self.literal or self.recursive else re.compile(fnmatch.translate(segment))
+    # Hidden files are matched by wildcards only if the segment starts with a dot as well.
+    self.hidden = segment.startswith('.')
+
+    # Indices of patterns, which end with this segment.
+    self.final = []
+    # Indices of patterns, which end with this segment followed by a slash, so only directories are matched.
+    self.dir_final = []
+
+  def matches(self, name: str) -> bool:
+    '''Returns True, if a listed name matches the segment.'''
+    if self.literal:
+      return name == self.segment
+
+    if name.startswith('.') and not self.hidden:
+      return False
+
+    return self.recursive or self.regex.match(name) is not None
+
 
 class PGlobber():
+  '''Resolves shell-style wildcards in remote paths. Filenames starting with a dot are special cases, which are not matched by '*' and '?' patterns (like in glob.glob).
+
+  The pattern is compiled into per-segment regular expressions. Segments without wildcards are appended to the path without any listing, the others are matched against attribute-bearing listings (PConnection.scandir), so no request is done for the individual files.
+  Only the directories matching a segment are descended into.
+  Several patterns can be resolved at once by glob_many. They are merged into a prefix tree, so a directory needed by more patterns is listed only once.'''
+
   def __init__(self, connection):
+    '''The constructor of PGlobber.
+
+    Args:
+      connection: The PConnection (or PConnectionPool), which is used to list the remote storage.
+    '''
     self._connection = connection
 
-  def glob(self, pathname, *, recursive=True):
-    """Return a list of paths matching a pathname pattern.
-    The pattern may contain simple shell-style wildcards a la
-    fnmatch. However, unlike fnmatch, filenames starting with a
-    dot are special cases that are not matched by '*' and '?'
-    patterns.
-    If recursive is true, the pattern '**' will match any files and
-    zero or more directories and subdirectories.
-    """
+  def glob(self, pathname: str, *, recursive: bool = True) -> list:
+    '''Returns a list of paths matching a pathname pattern. If no path matches, the list contains only the pattern itself.
+
+    Args:
+      pathname: The pattern. It may contain simple shell-style wildcards a la fnmatch.
+      recursive: If True, the pattern '**' matches any files and zero or more directories and subdirectories.
+    '''
     logging.info("Resolving remote wildcard {}".format(pathname))
     result = list(self._iglob(pathname, recursive=recursive))
 
+    return self.__result(pathname, result)
+
+  def iglob(self, pathname: str, *, recursive: bool = True) -> Iterator[str]:
+    '''Returns a lazy iterator of paths matching a pathname pattern. The paths are yielded as soon as their directory is listed, so the caller can process them (or stop the resolution) before the whole tree is listed.
+    Unlike glob, nothing is yielded, if no path matches.
+
+    Args:
+      pathname: The pattern (see glob).
+      recursive: If True, the pattern '**' matches any files and zero or more directories and subdirectories.
+    '''
+    logging.info("Resolving remote wildcard {}".format(pathname))
+
+    count = 0
+    sample = []
+
+    for match in self._iglob(pathname, recursive=recursive):
+      count += 1
+      if len(sample) < _LOG_SAMPLE_SIZE:
+        sample.append(match)
+
+      yield match
+
+    self.__log_result(pathname, count, sample)
+
+  def glob_many(self, pathnames: list, *, recursive: bool = True) -> list:
+    '''Resolves several patterns at once. Each directory is listed only once, even if it is needed by more patterns (eg. /in/*.csv and /in/*.ctl).
+
+    Args:
+      pathnames: A list of patterns (see glob).
+      recursive: If True, the pattern '**' matches any files and zero or more directories and subdirectories.
+
+    Returns:
+      A list of lists of matching paths, one for each pattern (in the same order). If no path matches a pattern, its list contains only the pattern itself.
+    '''
+    logging.info("Resolving remote wildcards {}".format(" ".join(pathnames)))
+
+    results = [[] for pathname in pathnames]
+    for index, match in self.__iglob_many(pathnames, recursive):
+      results[index].append(match)
+
+    return [self.__result(pathname, result) for pathname, result in zip(pathnames, results)]
+
+  def __result(self, pathname, result):
+    self.__log_result(pathname, len(result), result[:_LOG_SAMPLE_SIZE])
+
     if result == []:
-      logging.warning("Wildcard {} failed resolution. Returning {}".format(pathname, pathname))
       return [pathname]
-    else:
 
-      i_result = ""
-      for r in result:
-        i_result += "\n" + r
+    return result
+
+  @staticmethod
+  def __log_result(pathname, count, sample):
+    '''Logs the number of matches of a pattern and a bounded sample of them.'''
+    if count == 0:
+      logging.warning("Wildcard {} failed resolution. No path matches.".format(pathname))
+      return
 
-      logging.info("Wildcard {} succeded resolution. Returning {}".format(pathname, i_result))
-      return result
+    more = ", ..." if count > len(sample) else ""
+    logging.info("Wildcard {} succeded resolution with {} paths: {}{}".format(pathname, count, ", ".join(sample), more))
 
   def _iglob(self, pathname, *, recursive=False):
-    """Return an iterator which yields the paths matching a pathname pattern.
-    The pattern may contain simple shell-style wildcards a la
-    fnmatch. However, unlike fnmatch, filenames starting with a
-    dot are special cases that are not matched by '*' and '?'
-    patterns.
-    If recursive is true, the pattern '**' will match any files and
-    zero or more directories and subdirectories.
-    """
-    it = self.__iglob(pathname, recursive, False)
-    if recursive and self._isrecursive(pathname):
-      s = next(it)  # skip empty string
-      assert not s
-    return it
-
-  def __iglob(self, pathname, recursive, dironly):
-    dirname, basename = path.split(pathname)
-    if not self._has_magic(pathname):
-      assert not dironly
-      if basename:
-        if self._connection.lexists(pathname):
-          yield pathname
-      else:
-        # Patterns ending with a slash should match only directories
-        if self._connection.isdir(dirname):
-          yield pathname
-      return
-    if not dirname:
-      if recursive and self._isrecursive(basename):
-        yield from self._glob2(dirname, basename, dironly)
-      else:
-        yield from self.__glob1(dirname, basename, dironly)
-      return
-    # `os.path.split()` returns the argument itself as a dirname if it is a
-    # drive or UNC path.  Prevent an infinite recursion if a drive or UNC path
-    # contains magic characters (i.e. r'\\?\C:').
-    if dirname != pathname and self._has_magic(dirname):
-      dirs = __iglob(dirname, recursive, True)
-    else:
-      dirs = [dirname]
-    if self._has_magic(basename):
-      if recursive and self._isrecursive(basename):
-        self.glob_in_dir = self._glob2
-      else:
-        self.glob_in_dir = self.__glob1
-    else:
-      self.glob_in_dir = self.__glob0
-    for dirname in dirs:
-      for name in self.glob_in_dir(dirname, basename, dironly):
-        yield path.join(dirname, name)
-
-  # These 2 helper functions non-recursively glob inside a literal directory.
-  # They return a list of basenames.  __glob1 accepts a pattern while __glob0
-  # takes a literal basename (so it only has to check for its existence).
-
-  def __glob1(self, dirname, pattern, dironly):
-    names = list(self._iterdir(dirname, dironly))
-    if not self._ishidden(pattern):
-      names = (x for x in names if not self._ishidden(x))
-    return fnmatch.filter(names, pattern)
-
-  def __glob0(self, dirname, basename, dironly):
-    if not basename:
-      # `os.path.split()` returns an empty basename for paths ending with a
-      # directory separator.  'q*x/' should match only directories.
-      if self._connection.isdir(dirname):
-        return [basename]
-    else:
-      if self._connection.lexists(join(dirname, basename)):
-        return [basename]
-    return []
-
-
-  def _glob0(self, dirname, pattern):
-    return __glob0(dirname, pattern, False)
-
-  def _glob1(self, dirname, pattern):
-    return __glob1(dirname, pattern, False)
-
-  # This helper function recursively yields relative pathnames inside a literal
-  # directory.
-
-  def _glob2(self, dirname, pattern, dironly):
-    assert self._isrecursive(pattern)
-    yield pattern[:0]
-    yield from self._rlistdir(dirname, dironly)
-
-  # If dironly is false, yields all file names inside a directory.
-  # If dironly is true, yields only directory names.
-  def _iterdir(self, dirname, dironly):
-    if not dirname:
-      dirname = '/'
-    
-    for entry in self._connection.xls(dirname):
-      if not dironly or self._connection.isdir(entry):
-        yield path.basename(entry)
-    return
-
-  # Recursively yields relative pathnames inside a literal directory.
-  def _rlistdir(self, dirname, dironly):
-    names = list(self._iterdir(dirname, dironly))
-    for x in names:
-      if not self._ishidden(x):
-        yield x
-        lpath = path.join(dirname, x) if dirname else x
-        for y in self._rlistdir(lpath, dironly):
-          yield path.join(x, y)
-
-
-  def _has_magic(self, s):
-    if isinstance(s, bytes):
-      match = _magic_check_bytes.search(s)
-    else:
-      match = _magic_check.search(s)
-    return match is not None
-
-  def _ishidden(self, path):
-    return path[0] in ('.', b'.'[0])
-
-  def _isrecursive(self, pattern):
-    if isinstance(pattern, bytes):
-      return pattern == b'**'
-    else:
-      return pattern == '**'
+    '''Returns an iterator, which yields the paths matching a pathname pattern.'''
+    for index, match in self.__iglob_many([pathname], recursive):
+      yield match
+
+  def __iglob_many(self, pathnames, recursive):
+    '''Yields tuples (index of a pattern, matching path).'''
+    roots = self.__compile(pathnames, recursive)
+
+    for root_path, root in roots.items():
+      yield from self.__arrive(root_path, [root], None)
+
+  @staticmethod
+  def __compile(pathnames, recursive):
+    '''Compiles patterns into a prefix tree of _PGlobNode objects. Returns a dictionary of roots of the tree (which match the root of the patterns), '/' for absolute patterns and '' for relative ones.'''
+    roots = {}
+
+    for index, pathname in enumerate(pathnames):
+      if not pathname:
+        continue
+
+      root_path = '/' if pathname.startswith('/') else ''
+      node = root = roots.setdefault(root_path, _PGlobNode('', False))
+
+      segments = pathname.split('/')
+      dir_only = segments[-1] == ''
+
+      # Leading, trailing and repeated slashes don't create segments.
+      for segment in filter(None, segments):
+        # '**/**' matches the same paths as '**'.
+        if recursive and segment == '**' and node.recursive:
+          continue
+
+        node = node.children.setdefault(segment, _PGlobNode(segment, recursive))
+
+      if dir_only:
+        node.dir_final.append(index)
+      elif node is not root:
+        node.final.append(index)
+
+    return roots
+
+  def __arrive(self, remote_path, nodes, entry):
+    '''Yields matches of a path, whose last segment is matched by nodes, and continues into the path, if it is a directory.
+    The entry is the p_dir_entry of the path, if the path was listed (so it is known to exist), and None otherwise.'''
+    active = []
+
+    for node in nodes:
+      if node.recursive:
+        # Matches of '**' itself are yielded by __descend, it only continues into directories.
+        active.append(node)
+        continue
+
+      if node.final:
+        if entry is not None or self._connection.lexists(remote_path):
+          yield from ((index, remote_path) for index in node.final)
+
+      if node.dir_final:
+        if self.__isdir(remote_path, entry):
+          yield from ((index, path.join(remote_path, '')) for index in node.dir_final)
+
+      if node.children:
+        active.append(node)
+
+    if active and (entry is None or entry.is_dir()):
+      yield from self.__descend(remote_path, active, entry)
+
+  def __descend(self, dirpath, nodes, entry):
+    '''Matches children of nodes (which matched dirpath) against entries of the directory dirpath. The entry is the p_dir_entry of dirpath, if it was listed, and None otherwise.'''
+    active = list(nodes)
+    # Whether dirpath is a directory. A path built of literal segments hasn't been listed, so it is checked, when a match depends on it.
+    is_dir = None if entry is None else True
+
+    for node in nodes:
+      for child in node.children.values():
+        if child.recursive and child not in active:
+          active.append(child)
+
+          # '**' matches no directory as well (an empty relative path isn't a match, though).
+          if dirpath and (child.final or child.dir_final):
+            if is_dir is None:
+              is_dir = self.__isdir(dirpath, None)
+
+            if is_dir:
+              yield from ((index, path.join(dirpath, '')) for index in child.final + child.dir_final)
+
+    literals = {}
+    magic = []
+    recursive = []
+
+    for node in active:
+      if node.recursive:
+        recursive.append(node)
+
+      for child in node.children.values():
+        if child.literal:
+          literals.setdefault(child.segment, []).append(child)
+        elif not child.recursive:
+          magic.append(child)
+
+    # A single wildcard segment is passed to the server, which may filter the listing (see PConnection.scandir).
+    pattern = None
+    if len(magic) == 1 and not recursive and not literals and magic[0].segment != '*' and '[' not in magic[0].segment:
+      pattern = magic[0].segment
+
+    if magic or recursive:
+      for entry in self.__scandir(dirpath, pattern):
+        entry_path = path.join(dirpath, entry.name)
+        matched = [child for child in magic if child.matches(entry.name)]
+        matched.extend(literals.pop(entry.name, ()))
+
+        for node in recursive:
+          if not node.matches(entry.name):
+            continue
+
+          yield from ((index, entry_path) for index in node.final)
+          if node.dir_final and entry.is_dir():
+            yield from ((index, path.join(entry_path, '')) for index in node.dir_final)
+
+          matched.append(node)
+
+        if matched:
+          yield from self.__arrive(entry_path, matched, entry)
+
+    # Literal segments, which weren't listed (eg. because of a case insensitive storage or a directory, which can't be listed), are checked one by one.
+    for name, children in literals.items():
+      yield from self.__arrive(path.join(dirpath, name), children, None)
+
+  def __scandir(self, dirpath, pattern):
+    try:
+      return list(self._connection.scandir(dirpath or '.', pattern))
+    except OSError:
+      return []
+
+  def __isdir(self, remote_path, entry):
+    if entry is not None:
+      return entry.is_dir()
+
+    return self._connection.isdir(remote_path or '.')
 
   def _escape(self, pathname):
-    """Escape all special characters.
-    """
+    '''Escapes all special characters.'''
     # Escaping is done by wrapping any of "*?[" between square brackets.
-    # Metacharacters do not work in the drive part and shouldn't be _escaped.
-    drive, pathname = path.splitdrive(pathname)
-    if isinstance(pathname, bytes):
-      pathname = _magic_check_bytes.sub(br'[\1]', pathname)
-    else:
-      pathname = _magic_check.sub(r'[\1]', pathname)
-    return drive + pathname
+    return _magic_check.sub(r'[\1]', pathname)
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+import threading
+import time
+
+
+class PMetadataCache():
+  '''Bounded LRU cache of metadata of remote files (results of stat, lstat, exists, lexists and isdir) with time-limited entries.
+  Negative results (eg. the file doesn't exist) are cached as well.'''
+
+  def __init__(self, ttl: float, max_size: int):
+    '''The constructor of PMetadataCache.
+
+    Args:
+      ttl: Number of seconds, after which a cached entry expires.
+      max_size: Maximal number of cached entries. If it is exceeded, the least recently used entry is evicted.
+    '''
+    self.__ttl = ttl
+    self.__max_size = max_size
+
+    self.__entries = OrderedDict()
+    self.__lock = threading.Lock()
+
+  def get(self, kind: str, remote_path: str):
+    '''Looks up a cached value.
+
+    Args:
+      kind: Kind of the metadata (eg. 'stat', 'exists').
+      remote_path: A normalized remote path.
+
+    Returns:
+      A tuple (found, value). If there is no valid entry, found is False.
+    '''
+    key = (kind, remote_path)
+
+    with self.__lock:
+      entry = self.__entries.get(key)
+      if entry is None:
+        return (False, None)
+
+      expires, value = entry
+      if expires < time.monotonic():
+        del self.__entries[key]
+        return (False, None)
+
+      self.__entries.move_to_end(key)
+      return (True, value)
+
+  def put(self, kind: str, remote_path: str, value):
+    '''Stores a value into the cache.
+
+    Args:
+      kind: Kind of the metadata (eg. 'stat', 'exists').
+      remote_path: A normalized remote path.
+      value: The value to cache.
+    '''
+    key = (kind, remote_path)
+
+    with self.__lock:
+      self.__entries[key] = (time.monotonic() + self.__ttl, value)
+      self.__entries.move_to_end(key)
+
+      while len(self.__entries) > self.__max_size:
+        self.__entries.popitem(last=False)
+
+  def invalidate(self, remote_path: str, recursive: bool = False):
+    '''Removes all entries of a remote path.
+
+    Args:
+      remote_path: A normalized remote path.
+      recursive: If True, entries of all files under remote_path are removed as well.
+    '''
+    if recursive:
+      prefix = remote_path.rstrip('/') + '/'
+
+      def affected(path):
+        return path == remote_path or path.startswith(prefix)
+
+    else:
+      def affected(path):
+        return path == remote_path
+
+    with self.__lock:
+      for key in [k for k in self.__entries if affected(k[1])]:
+        del self.__entries[key]
+
+  def clear(self):
+    '''Removes all entries from the cache.'''
+    with self.__lock:
+      self.__entries.clear()
+
+  def __len__(self):
+    with self.__lock:
+      return len(self.__entries)
@@ -0,0 +1,202 @@
+import io
+
+from rfslib.ptranscoder import PTranscoder, CHUNK_SIZE
+
+
+class PRawAdapter(io.RawIOBase):
+  '''Adapts an arbitrary binary file-like object (eg. paramiko.SFTPFile) to io.RawIOBase, so it can be wrapped by io.BufferedReader, io.BufferedWriter or io.TextIOWrapper.'''
+
+  def __init__(self, file):
+    '''The constructor of PRawAdapter.
+
+    Args:
+      file: A file-like object with read or write method. Methods seek and tell are used, if present.
+    '''
+    self.__file = file
+
+  def readable(self):
+    return hasattr(self.__file, 'read')
+
+  def writable(self):
+    return hasattr(self.__file, 'write')
+
+  def seekable(self):
+    seekable = getattr(self.__file, 'seekable', None)
+    if seekable is not None:
+      return seekable()
+
+    return hasattr(self.__file, 'seek')
+
+  def readinto(self, b):
+    data = self.__file.read(len(b))
+    b[:len(data)] = data
+    return len(data)
+
+  def write(self, b):
+    self.__file.write(bytes(b))
+    return len(b)
+
+  def seek(self, offset, whence=io.SEEK_SET):
+    self.__file.seek(offset, whence)
+    return self.__file.tell()
+
+  def tell(self):
+    return self.__file.tell()
+
+  def close(self):
+    if not self.closed:
+      try:
+        self.__file.close()
+      finally:
+        super().close()
+
+
+class PTranscodingReader(io.RawIOBase):
+  '''A stream layer, which transcodes data read from an underlying binary stream by PTranscoder.'''
+
+  def __init__(self, raw, transcoder: PTranscoder, chunk_size: int = CHUNK_SIZE):
+    '''The constructor of PTranscodingReader.
+
+    Args:
+      raw: An underlying binary stream opened for reading. It is closed together with the reader.
+      transcoder: A transcoder, which is used to transcode the data.
+      chunk_size: The number of bytes read from the underlying stream at once.
+    '''
+    self.__raw = raw
+    self.__transcoder = transcoder
+    self.__chunk_size = chunk_size
+
+    self.__buffer = b''
+    # The position of the first unread byte of the buffer, so the rest of the buffer isn't copied by each read.
+    self.__offset = 0
+    self.__eof = False
+
+  def readable(self):
+    return True
+
+  def readinto(self, b):
+    while self.__offset == len(self.__buffer) and not self.__eof:
+      chunk = self.__raw.read(self.__chunk_size)
+
+      if chunk:
+        self.__buffer = self.__transcoder.transcode(chunk)
+      else:
+        self.__buffer = self.__transcoder.transcode(b'', final=True)
+        self.__eof = True
+
+      self.__offset = 0
+
+    size = min(len(b), len(self.__buffer) - self.__offset)
+    b[:size] = memoryview(self.__buffer)[self.__offset:self.__offset + size]
+    self.__offset += size
+
+    return size
+
+  def close(self):
+    if not self.closed:
+      try:
+        self.__raw.close()
+      finally:
+        super().close()
+
+
+class PTranscodingWriter(io.RawIOBase):
+  '''A stream layer, which transcodes data by PTranscoder before they are written to an underlying binary stream.'''
+
+  def __init__(self, raw, transcoder: PTranscoder):
+    '''The constructor of PTranscodingWriter.
+
+    Args:
+      raw: An underlying binary stream opened for writing. It is closed together with the writer.
+      transcoder: A transcoder, which is used to transcode the data.
+    '''
+    self.__raw = raw
+    self.__transcoder = transcoder
+
+  def writable(self):
+    return True
+
+  def write(self, b):
+    self.__raw.write(self.__transcoder.transcode(b))
+    return len(b)
+
+  def close(self):
+    if not self.closed:
+      try:
+        self.__raw.write(self.__transcoder.transcode(b'', final=True))
+        self.__raw.close()
+      finally:
+        super().close()
+
+
+class PRemoteWriter():
+  '''A proxy of a stream opened for writing, which finishes the write (eg. moves a temporary file to the target path), when the stream is successfully closed.
+  If the stream is used as a context manager and an exception is raised inside, the write is aborted instead.
+  All other attributes are delegated to the underlying stream.'''
+
+  def __init__(self, stream, commit, abort):
+    '''The constructor of PRemoteWriter.
+
+    Args:
+      stream: The underlying stream opened for writing.
+      commit: A procedure without arguments, which is called after the stream is closed.
+      abort: A procedure without arguments, which is called after the stream is closed because of an exception.
+    '''
+    self.__stream = stream
+    self.__commit = commit
+    self.__abort = abort
+
+    self.__finished = False
+
+  def __getattr__(self, name):
+    return getattr(self.__stream, name)
+
+  def __iter__(self):
+    return iter(self.__stream)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, exc_type, exc_val, exc_tb):
+    if exc_type is None:
+      self.close()
+    else:
+      self.abort()
+
+  @property
+  def closed(self):
+    return self.__finished
+
+  def close(self):
+    '''Closes the stream and finishes the write.'''
+    if self.__finished:
+      return
+
+    self.__finished = True
+
+    try:
+      self.__stream.close()
+    except BaseException:
+      self.__abort()
+      raise
+
+    self.__commit()
+
+  def abort(self):
+    '''Closes the stream and throws written data away, if possible.'''
+    if self.__finished:
+      return
+
+    self.__finished = True
+
+    try:
+      if isinstance(self.__stream, PRemoteWriter):
+        # A nested writer (eg. a stream of a pooled connection) must not finish its write.
+        self.__stream.abort()
+      else:
+        self.__stream.close()
+    except Exception:
+      # The written data are thrown away anyway.
+      pass
+
+    self.__abort()
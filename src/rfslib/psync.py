@@ -0,0 +1,379 @@
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import time
+
+from rfslib.abstract_pconnection import p_transfer_stats
+from rfslib.path_utils import path_normalize
+from rfslib.ptranscoder import CHUNK_SIZE
+
+
+# Modification times closer than this (in seconds) are considered equal (eg. FAT and some SMB servers store them with 2 s precision).
+_MTIME_TOLERANCE = 2.0
+
+
+class p_sync_action():
+  '''An action of a synchronization plan (see PSync.plan).'''
+
+  kind:str = None
+  '''The kind of the action: 'mkdir' (create a directory in the target tree), 'transfer' (copy a file from the source tree) or 'delete' (remove a file or a directory tree from the target tree).'''
+  path:str = None
+  '''The path relative to the roots of the trees ('' for the roots themselves).'''
+  reason:str = None
+  '''Why the action is needed: 'new', 'size', 'mtime' or 'checksum' for transfers, 'extraneous' or 'type' (the target has a different type than the source) for deletions.'''
+
+  size:int = 0
+  '''The size of the transferred file in bytes (transfers only).'''
+  mtime:float = None
+  '''The modification time of the transferred file (transfers only).'''
+  is_dir:bool = False
+  '''True, if the deleted file is a directory, which is deleted recursively (deletions only).'''
+
+  def __init__(self, kind: str, path: str, reason: str, size: int = 0, mtime: float = None, is_dir: bool = False):
+    self.kind = kind
+    self.path = path
+    self.reason = reason
+    self.size = size
+    self.mtime = mtime
+    self.is_dir = is_dir
+
+  def __str__(self):
+    return f"{self.kind} {self.path or '.'} ({self.reason})"
+
+  def __repr__(self):
+    return f"<p_sync_action {self}>"
+
+
+class p_sync_plan():
+  '''A list of actions, which make a target tree equal to a source tree. It is returned by PSync.plan and carried out by PSync.apply.'''
+
+  direction:str = None
+  '''Either 'push' (the source tree is local) or 'pull' (the source tree is remote).'''
+  src:str = None
+  '''The root of the source tree.'''
+  dst:str = None
+  '''The root of the target tree.'''
+  actions:list = None
+  '''A list of p_sync_action objects in the order, in which they are carried out.'''
+  stats:p_transfer_stats = None
+  '''Statistics of the transfer, when the plan is applied (None otherwise).'''
+
+  def __init__(self, direction: str, src: str, dst: str):
+    self.direction = direction
+    self.src = src
+    self.dst = dst
+    self.actions = []
+
+  def transfer_bytes(self) -> int:
+    '''Returns the number of bytes, which are transferred by the plan.'''
+    return sum(action.size for action in self.actions)
+
+  def count(self, kind: str) -> int:
+    '''Returns the number of actions of the kind.'''
+    return sum(1 for action in self.actions if action.kind == kind)
+
+  def __str__(self):
+    '''Returns the actions, one per line (the output of a dry run).'''
+    return "\n".join(str(action) for action in self.actions)
+
+  def __repr__(self):
+    return f"<p_sync_plan {self.direction} {self.src} -> {self.dst}: {self.count('transfer')} transfers ({self.transfer_bytes()} bytes), {self.count('mkdir')} mkdirs, {self.count('delete')} deletions>"
+
+
+class _PSyncFile():
+  '''Attributes of a file of a synchronized tree, which are compared.'''
+
+  def __init__(self, is_dir, size, mtime):
+    self.is_dir = is_dir
+    self.size = size
+    self.mtime = mtime
+
+
+class _PLocalTree():
+  '''The local side of a synchronization.'''
+
+  def __init__(self, root):
+    self.root = os.path.normpath(root)
+
+  def path(self, rel_path):
+    return os.path.join(self.root, rel_path) if rel_path else self.root
+
+  def info(self, rel_path):
+    try:
+      st = os.stat(self.path(rel_path))
+    except FileNotFoundError:
+      return None
+
+    return _PSyncFile(stat.S_ISDIR(st.st_mode), st.st_size, st.st_mtime)
+
+  def list(self, rel_path):
+    files = {}
+
+    with os.scandir(self.path(rel_path)) as entries:
+      for entry in entries:
+        try:
+          st = entry.stat()
+        except FileNotFoundError:
+          logging.debug(f"Skipping a broken symlink {entry.path}.")
+          continue
+
+        files[entry.name] = _PSyncFile(stat.S_ISDIR(st.st_mode), st.st_size, st.st_mtime)
+
+    return files
+
+  def open(self, rel_path):
+    return open(self.path(rel_path), 'rb')
+
+  def mkdir(self, rel_path):
+    os.mkdir(self.path(rel_path))
+
+  def delete(self, rel_path, is_dir):
+    if is_dir:
+      shutil.rmtree(self.path(rel_path))
+    else:
+      os.unlink(self.path(rel_path))
+
+
+class _PRemoteTree():
+  '''The remote side of a synchronization.'''
+
+  def __init__(self, connection, root):
+    self.connection = connection
+    self.root = path_normalize(root)
+
+  def path(self, rel_path):
+    return os.path.join(self.root, rel_path) if rel_path else self.root
+
+  def info(self, rel_path):
+    remote_path = self.path(rel_path)
+    if not self.connection.exists(remote_path):
+      return None
+
+    st = self.connection.stat(remote_path)
+    return _PSyncFile(self.connection.isdir(remote_path), st.st_size, st.st_mtime)
+
+  def list(self, rel_path):
+    files = {}
+
+    for entry in self.connection.scandir(self.path(rel_path)):
+      # Symlinks are followed; it is the only case, when an attribute costs a further request.
+      try:
+        st = entry.stat()
+        is_dir = entry.is_dir()
+      except FileNotFoundError:
+        logging.debug(f"Skipping a broken symlink {entry.path}.")
+        continue
+
+      files[entry.name] = _PSyncFile(is_dir, st.st_size, st.st_mtime)
+
+    return files
+
+  def open(self, rel_path):
+    return self.connection.open(self.path(rel_path), 'rb')
+
+  def mkdir(self, rel_path):
+    self.connection.mkdir(self.path(rel_path))
+
+  def delete(self, rel_path, is_dir):
+    self.connection.rm(self.path(rel_path), recursive=is_dir)
+
+
+class PSync():
+  '''Incremental synchronization of a local tree and a remote tree (similar to rsync). Only new and changed files are transferred.
+
+  Both trees are listed directory by directory with attribute-bearing listings (PConnection.scandir and os.scandir), so the files are compared without any further requests. Directories, which don't exist in the target tree, aren't listed there at all.'''
+
+  def __init__(self, connection):
+    '''The constructor of PSync.
+
+    Args:
+      connection: The PConnection (or PConnectionPool) of the remote tree.
+    '''
+    self.__connection = connection
+
+  def sync(self, src: str, dst: str, direction: str = 'push', compare=('size', 'mtime'), delete: bool = False, dry_run: bool = False) -> p_sync_plan:
+    '''Makes the target tree equal to the source tree. Files are transferred, if they are new or changed. Directories are created, if they are missing.
+
+    Args:
+      src: The root of the source tree (a local path for push, a remote path for pull). It can be a directory or a single file.
+      dst: The root of the target tree.
+      direction: Either 'push' (from a local src to a remote dst) or 'pull' (from a remote src to a local dst).
+      compare: How files are compared. Either a tuple of 'size' and/or 'mtime', or 'checksum' (SHA-256 of the content, which means reading of both files). A file is changed, if it has a different size, or if the source file is newer than the target file (pull sets modification times of the local files to the remote ones, push can't set them, so the upload time is compared). Sizes aren't compared, if text_transmission is enabled, since transcoding changes them.
+      delete: If True, files of the target tree, which don't exist in the source tree, are deleted. A file of the target tree, which has a different type (a directory instead of a file or vice versa), is replaced as well.
+      dry_run: If True, the plan is only computed and nothing is changed.
+
+    Returns:
+      The plan of the synchronization (see p_sync_plan). If it was applied, its stats are filled.
+    '''
+    plan = self.plan(src, dst, direction, compare, delete)
+
+    if not dry_run:
+      self.apply(plan)
+
+    return plan
+
+  def plan(self, src: str, dst: str, direction: str = 'push', compare=('size', 'mtime'), delete: bool = False) -> p_sync_plan:
+    '''Compares the trees and returns the plan of the synchronization without changing anything. See sync for the arguments.'''
+    logging.debug(f"Planning of synchronization of {src} to {dst} ({direction}).")
+
+    src_tree, dst_tree = self.__trees(src, dst, direction)
+    compare = self.__compare_modes(compare)
+
+    plan = p_sync_plan(direction, src_tree.root, dst_tree.root)
+    deletions = []
+
+    src_info = src_tree.info('')
+    if src_info is None:
+      raise FileNotFoundError(f"Source file {src} not found.")
+
+    self.__plan_tree(plan, deletions, src_tree, dst_tree, compare, delete, '', src_info, dst_tree.info(''))
+
+    # Files are deleted at the end, so nothing is lost, if a transfer fails.
+    plan.actions.extend(deletions)
+
+    logging.debug(f"Planning of synchronization of {src} to {dst} ({direction}) is completed: {plan!r}.")
+    return plan
+
+  def apply(self, plan: p_sync_plan) -> p_transfer_stats:
+    '''Carries out the actions of a plan.
+
+    Args:
+      plan: A plan returned by plan.
+
+    Returns:
+      Statistics of the transfer (they are also stored in plan.stats).
+    '''
+    logging.debug(f"Applying {plan!r}.")
+
+    src_tree, dst_tree = self.__trees(plan.src, plan.dst, plan.direction)
+
+    stats = p_transfer_stats()
+    start = time.monotonic()
+
+    for action in plan.actions:
+      logging.debug(f"Synchronization: {action}.")
+
+      if action.kind == 'mkdir':
+        dst_tree.mkdir(action.path)
+
+      elif action.kind == 'delete':
+        dst_tree.delete(action.path, action.is_dir)
+
+      else:
+        self.__transfer(plan.direction, src_tree, dst_tree, action)
+
+        stats.files += 1
+        stats.bytes += action.size
+
+    stats.seconds = time.monotonic() - start
+    plan.stats = stats
+
+    logging.debug(f"Applying {plan!r} is completed: {stats}.")
+    return stats
+
+  def __trees(self, src, dst, direction):
+    if direction == 'push':
+      return _PLocalTree(src), _PRemoteTree(self.__connection, dst)
+
+    if direction == 'pull':
+      return _PRemoteTree(self.__connection, src), _PLocalTree(dst)
+
+    raise ValueError(f"Unknown direction {direction}, expected 'push' or 'pull'.")
+
+  def __compare_modes(self, compare):
+    modes = (compare,) if isinstance(compare, str) else tuple(compare)
+
+    for mode in modes:
+      if mode not in ('size', 'mtime', 'checksum'):
+        raise ValueError(f"Unknown comparison {mode}, expected 'size', 'mtime' or 'checksum'.")
+
+    if self.__connection.get_settings().text_transmission:
+      # Transcoding changes sizes of the files.
+      modes = tuple(mode for mode in modes if mode != 'size')
+
+    return modes
+
+  def __plan_tree(self, plan, deletions, src_tree, dst_tree, compare, delete, rel_path, src_info, dst_info):
+    '''Adds actions for a file (or a directory tree) of the source tree and its counterpart of the target tree (dst_info is None, if it doesn't exist).'''
+    # The directories are processed iteratively, so deep trees don't exhaust the stack.
+    stack = [(rel_path, src_info, dst_info)]
+
+    while stack:
+      rel_path, src_info, dst_info = stack.pop()
+
+      if dst_info is not None and dst_info.is_dir != src_info.is_dir:
+        if not delete:
+          raise InterruptedError(f"Cannot synchronize {src_tree.path(rel_path)} to {dst_tree.path(rel_path)}, one of them is a directory and the other one isn't.")
+
+        # The target is replaced before anything is written to its path.
+        plan.actions.append(p_sync_action('delete', rel_path, 'type', is_dir=dst_info.is_dir))
+        dst_info = None
+
+      if not src_info.is_dir:
+        reason = 'new' if dst_info is None else self.__changed(src_tree, dst_tree, compare, rel_path, src_info, dst_info)
+        if reason is not None:
+          plan.actions.append(p_sync_action('transfer', rel_path, reason, src_info.size, src_info.mtime))
+        continue
+
+      if dst_info is None:
+        plan.actions.append(p_sync_action('mkdir', rel_path, 'new'))
+        dst_files = {}
+      else:
+        dst_files = dst_tree.list(rel_path)
+
+      src_files = src_tree.list(rel_path)
+
+      if delete:
+        for name in sorted(dst_files.keys() - src_files.keys()):
+          deletions.append(p_sync_action('delete', os.path.join(rel_path, name), 'extraneous', is_dir=dst_files[name].is_dir))
+
+      # Entries are pushed in reverse, so they are planned in sorted order.
+      for name in sorted(src_files, reverse=True):
+        stack.append((os.path.join(rel_path, name), src_files[name], dst_files.get(name)))
+
+  @staticmethod
+  def __changed(src_tree, dst_tree, compare, rel_path, src_info, dst_info):
+    '''Returns the reason, why a file has to be transferred, or None, if it is up to date.'''
+    if 'size' in compare and src_info.size != dst_info.size:
+      return 'size'
+
+    if 'mtime' in compare:
+      if src_info.mtime is None or dst_info.mtime is None:
+        return 'mtime'
+
+      if src_info.mtime > dst_info.mtime + _MTIME_TOLERANCE:
+        return 'mtime'
+
+    if 'checksum' in compare:
+      if PSync.__checksum(src_tree, rel_path) != PSync.__checksum(dst_tree, rel_path):
+        return 'checksum'
+
+    return None
+
+  @staticmethod
+  def __checksum(tree, rel_path):
+    digest = hashlib.sha256()
+
+    with tree.open(rel_path) as f:
+      while True:
+        data = f.read(CHUNK_SIZE)
+        if not data:
+          break
+
+        digest.update(data)
+
+    return digest.digest()
+
+  def __transfer(self, direction, src_tree, dst_tree, action):
+    if direction == 'push':
+      self.__connection.push(src_tree.path(action.path), dst_tree.path(action.path))
+      return
+
+    local_path = dst_tree.path(action.path)
+    self.__connection.pull(src_tree.path(action.path), local_path)
+
+    # The local file gets the remote modification time, so the next synchronization recognizes it as unchanged.
+    if action.mtime is not None:
+      os.utime(local_path, (time.time(), action.mtime))
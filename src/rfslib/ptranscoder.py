@@ -0,0 +1,192 @@
+import codecs
+import importlib
+
+
+CHUNK_SIZE = 1024 * 1024
+'''Default size of a chunk (in bytes), which is read at once during transcoding of a stream.'''
+
+_UNDEFINED = '\ufffe'
+
+
+def _decoding_table(encoding):
+  '''Returns a string of 256 characters, which maps bytes of a single byte encoding to characters (undefined bytes are mapped to U+FFFE). Returns None for other encodings.'''
+  name = codecs.lookup(encoding).name
+
+  if name == 'ascii':
+    return ''.join(map(chr, range(128))) + _UNDEFINED * 128
+
+  try:
+    module = importlib.import_module('encodings.' + name.replace('-', '_'))
+  except ImportError:
+    return None
+
+  table = getattr(module, 'decoding_table', None)
+  if isinstance(table, str) and len(table) == 256:
+    return table
+
+  return None
+
+
+def _has_ascii_newlines(encoding):
+  '''Returns True, if bytes 0x0A and 0x0D always represent LF and CR in the encoding and never occur inside of other characters.'''
+  if codecs.lookup(encoding).name == 'utf-8':
+    return True
+
+  table = _decoding_table(encoding)
+  return table is not None and table[0x0a] == '\n' and table[0x0d] == '\r'
+
+
+class PTranscoder():
+  '''Incremental recoder of text data from one encoding and line endings to another ones.
+  Data can be fed in chunks of arbitrary size. Multibyte characters and CRLF sequences split between two chunks are handled correctly, so memory usage doesn't depend on the size of transcoded data.
+
+  Whenever possible, data are transcoded directly on bytes and no unicode decoding is done:
+
+  - If both encodings and line endings are the same, data are copied as they are (without validation of the encoding).
+  - If only line endings differ and the encoding is UTF8 or an ASCII compatible single byte encoding, only line endings are substituted.
+  - If both encodings are ASCII compatible single byte encodings, bytes are translated by a table.
+
+  Otherwise data are decoded to unicode and encoded back.'''
+
+  def __init__(self, from_encoding: str, to_encoding: str, from_crlf: bool = False, to_crlf: bool = False):
+    '''The constructor of PTranscoder.
+
+    Args:
+      from_encoding: The encoding of input data. (eg. 'UTF8')
+      to_encoding: The encoding of output data. (eg. 'cp1250')
+      from_crlf: Does input data use CRLF? If False, it is supposed, they use LF.
+      to_crlf: Should output data use CRLF? If False, LF will be used.
+    '''
+    self.__from_encoding = from_encoding
+    self.__to_encoding = to_encoding
+
+    self.__from_crlf = from_crlf
+    self.__to_crlf = to_crlf
+
+    # A trailing CR of the previous chunk, which may be a beginning of a CRLF sequence.
+    self.__pending_cr = False
+
+    same_encoding = codecs.lookup(from_encoding).name == codecs.lookup(to_encoding).name
+
+    if same_encoding and from_crlf == to_crlf:
+      self.__transcode = self.__transcode_identity
+
+    elif same_encoding and _has_ascii_newlines(from_encoding):
+      self.__transcode = self.__transcode_newlines
+
+    elif self.__prepare_byte_table():
+      self.__transcode = self.__transcode_byte_table
+
+    else:
+      self.__decoder = codecs.getincrementaldecoder(from_encoding)()
+      self.__encoder = codecs.getincrementalencoder(to_encoding)()
+      self.__transcode = self.__transcode_unicode
+
+  def is_identity(self) -> bool:
+    '''Returns True, if the transcoder doesn't change data at all.'''
+    return self.__transcode == self.__transcode_identity
+
+  def __prepare_byte_table(self):
+    if not (_has_ascii_newlines(self.__from_encoding) and _has_ascii_newlines(self.__to_encoding)):
+      return False
+
+    from_table = _decoding_table(self.__from_encoding)
+    if from_table is None or _decoding_table(self.__to_encoding) is None:
+      return False
+
+    table = bytearray(range(256))
+    valid = bytearray()
+
+    for byte, char in enumerate(from_table):
+      if char == _UNDEFINED:
+        continue
+
+      try:
+        encoded = char.encode(self.__to_encoding)
+      except UnicodeEncodeError:
+        continue
+
+      table[byte] = encoded[0]
+      valid.append(byte)
+
+    self.__byte_table = bytes(table)
+    self.__valid_bytes = bytes(valid)
+    return True
+
+  def __translate_newlines(self, text, final, cr, lf, crlf):
+    if self.__from_crlf == self.__to_crlf:
+      return text
+
+    if self.__to_crlf:
+      return text.replace(lf, crlf)
+
+    if self.__pending_cr:
+      text = cr + text
+      self.__pending_cr = False
+
+    if not final and text.endswith(cr):
+      text = text[:-1]
+      self.__pending_cr = True
+
+    return text.replace(crlf, lf)
+
+  def __transcode_identity(self, data, final):
+    return bytes(data)
+
+  def __transcode_newlines(self, data, final):
+    return self.__translate_newlines(bytes(data), final, b'\r', b'\n', b'\r\n')
+
+  def __transcode_byte_table(self, data, final):
+    data = bytes(data)
+
+    if data.translate(None, self.__valid_bytes):
+      # Some bytes can't be translated, the unicode path raises the appropriate UnicodeError.
+      codecs.decode(data, self.__from_encoding).encode(self.__to_encoding)
+
+    data = data.translate(self.__byte_table)
+    return self.__translate_newlines(data, final, b'\r', b'\n', b'\r\n')
+
+  def __transcode_unicode(self, data, final):
+    text = self.__decoder.decode(data, final)
+    text = self.__translate_newlines(text, final, '\r', '\n', '\r\n')
+    return self.__encoder.encode(text, final)
+
+  def transcode(self, data: bytes, final: bool = False) -> bytes:
+    '''Transcodes a next chunk of data.
+
+    Args:
+      data: A chunk of input data (bytes, bytearray or memoryview).
+      final: True, if it is the last chunk. Incomplete characters left at the end of input raise UnicodeDecodeError.
+
+    Returns:
+      Transcoded data. Their length may differ from the length of the input chunk, because unfinished sequences are kept for the next call.
+    '''
+    return self.__transcode(data, final)
+
+  def copy(self, inp, out, chunk_size: int = CHUNK_SIZE):
+    '''Transcodes whole content of a binary file object inp and writes it to a binary file object out.
+
+    Args:
+      inp: A file object opened for reading in the binary mode.
+      out: A file object opened for writing in the binary mode.
+      chunk_size: The number of bytes read at once.
+    '''
+    if self.is_identity() and hasattr(inp, 'readinto'):
+      buffer = bytearray(chunk_size)
+      view = memoryview(buffer)
+
+      while True:
+        size = inp.readinto(buffer)
+        if not size:
+          return
+
+        out.write(view[:size])
+
+    while True:
+      chunk = inp.read(chunk_size)
+      if not chunk:
+        break
+
+      out.write(self.transcode(chunk))
+
+    out.write(self.transcode(b'', final=True))
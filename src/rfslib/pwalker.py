@@ -0,0 +1,189 @@
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+import queue
+import threading
+
+
+class _PWalkNode():
+  '''A listed directory of a bottom up unordered walk, which waits for its subdirectories.'''
+
+  def __init__(self, parent, listing):
+    self.parent = parent
+    self.listing = listing
+    self.remaining = 0
+
+
+class PWalker():
+  '''Parallel traversal of a remote directory tree. Directories are listed concurrently by worker threads (each of them with its own connection) and the listings are streamed back to the consumer.
+
+  In the ordered mode, the directories are yielded in exactly the same order as by a sequential depth-first walk. Listings of directories, which will be needed soon, are fetched ahead.
+  In the unordered mode, the directories are yielded as soon as they are listed, so a single slow directory doesn't hold the others back.
+
+  Only a bounded number of listings is fetched ahead, so memory usage stays proportional to the depth of the tree (and the number of workers) rather than to its size.'''
+
+  def __init__(self, listers: list, ordered: bool = True, prefetch: int = None):
+    '''The constructor of PWalker.
+
+    Args:
+      listers: A list of functions, one for each worker. Each of them takes a remote path of a directory and returns a tuple (dirs, files) of lists of entries with attribute path (eg. p_dir_entry). A function is always called from the same thread, so it can use its own connection.
+      ordered: If True, directories are yielded in the order of a sequential walk. Otherwise, they are yielded as soon as they are listed.
+      prefetch: The maximal number of directories listed ahead. Defaults to 4 times the number of workers.
+    '''
+    self.__listers = listers
+    self.__ordered = ordered
+
+    if prefetch is None:
+      prefetch = 4 * len(listers)
+    self.__prefetch = max(prefetch, len(listers))
+
+  def walk(self, top: str, topdown: bool = True, onerror=None):
+    '''Walks the tree rooted at top (which is supposed to be a directory).
+
+    Args:
+      top: The remote path of the root of the tree.
+      topdown: If True, a directory is yielded before its subdirectories. The subdirectories are taken from the yielded dirs list after the consumer resumes the generator, so it can be pruned in place. Otherwise, a directory is yielded after all its subdirectories.
+      onerror: A function, which is called with the exception, if a directory can't be listed. The walk continues afterwards, unless the function raises. If None, the errors are ignored.
+
+    Returns:
+      An iterator of tuples (dirpath, dirs, files).
+    '''
+    tasks = queue.Queue()
+    stopped = threading.Event()
+
+    def submit(remote_path):
+      future = Future()
+      tasks.put((remote_path, future))
+      return future
+
+    threads = [threading.Thread(target=self.__work, args=(lister, tasks, stopped), daemon=True) for lister in self.__listers]
+    for thread in threads:
+      thread.start()
+
+    try:
+      if self.__ordered:
+        yield from self.__walk_ordered(top, topdown, onerror, submit)
+      else:
+        yield from self.__walk_unordered(top, topdown, onerror, submit)
+
+    finally:
+      stopped.set()
+
+      for thread in threads:
+        tasks.put(None)
+
+      for thread in threads:
+        thread.join()
+
+  @staticmethod
+  def __work(lister, tasks, stopped):
+    while True:
+      task = tasks.get()
+      if task is None:
+        return
+
+      remote_path, future = task
+      if stopped.is_set() or not future.set_running_or_notify_cancel():
+        continue
+
+      try:
+        future.set_result(lister(remote_path))
+      except Exception as e:
+        future.set_exception(e)
+
+  @staticmethod
+  def __listing(future, onerror):
+    try:
+      return future.result()
+
+    except Exception as e:
+      if onerror is not None:
+        onerror(e)
+
+      return None
+
+  def __schedule_ahead(self, stack, submit):
+    '''Submits directories from the top of the stack (which will be yielded first), until the limit of listings fetched ahead is reached.'''
+    in_flight = 0
+
+    for item in reversed(stack):
+      if in_flight >= self.__prefetch:
+        return
+
+      if isinstance(item, list):
+        if item[1] is None:
+          item[1] = submit(item[0])
+        in_flight += 1
+
+  def __walk_ordered(self, top, topdown, onerror, submit):
+    # Lists [path, future] are directories to be listed, tuples are listed directories waiting for their subdirectories (bottom up only).
+    stack = [[top, None]]
+
+    while stack:
+      self.__schedule_ahead(stack, submit)
+      item = stack.pop()
+
+      if isinstance(item, tuple):
+        yield item
+        continue
+
+      remote_path, future = item
+      listing = self.__listing(future, onerror)
+      if listing is None:
+        continue
+
+      dirs, files = listing
+
+      if topdown:
+        yield remote_path, dirs, files
+      else:
+        stack.append((remote_path, dirs, files))
+
+      stack.extend([entry.path, None] for entry in reversed(dirs))
+
+  def __walk_unordered(self, top, topdown, onerror, submit):
+    # Directories waiting for a free slot; they are taken in LIFO order to keep the walk depth-first.
+    waiting = [(top, None)]
+    in_flight = {}
+
+    while waiting or in_flight:
+      while waiting and len(in_flight) < self.__prefetch:
+        remote_path, parent = waiting.pop()
+        in_flight[submit(remote_path)] = (remote_path, parent)
+
+      done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+      for future in done:
+        remote_path, parent = in_flight.pop(future)
+        listing = self.__listing(future, onerror)
+
+        if topdown:
+          if listing is None:
+            continue
+
+          dirs, files = listing
+          yield remote_path, dirs, files
+
+          waiting.extend((entry.path, None) for entry in reversed(dirs))
+
+        else:
+          node = _PWalkNode(parent, None if listing is None else (remote_path,) + tuple(listing))
+
+          if listing is not None and listing[0]:
+            node.remaining = len(listing[0])
+            waiting.extend((entry.path, node) for entry in reversed(listing[0]))
+          else:
+            yield from self.__finish(node)
+
+  @staticmethod
+  def __finish(node):
+    '''Yields a completed directory of a bottom up walk and all its ancestors, which are completed by it.'''
+    while node is not None:
+      if node.listing is not None:
+        yield node.listing
+
+      node = node.parent
+      if node is None:
+        return
+
+      node.remaining -= 1
+      if node.remaining:
+        return
@@ -1,13 +1,98 @@
 import paramiko
+from paramiko.sftp import CMD_EXTENDED
 from rfslib import abstract_pconnection, pconnection_settings
 
 from stat import S_ISDIR
+import io
 import logging
+import shutil
+import threading
+
+
+try:
+  from paramiko.sftp import int64
+except ImportError:
+  # paramiko older than 3.0 packs all integers of requests as 64 bit.
+  int64 = int
+
+
+def _is_unsupported(error):
+  '''Returns True, if an error of an extended request means, that the server doesn't support the extension.
+  paramiko maps only missing files and denied permissions to errno, other status codes (eg. SSH_FX_OP_UNSUPPORTED) are reported by the text of the server.'''
+  if error.errno is not None:
+    return False
+
+  text = str(error).lower()
+  return 'unsupported' in text or 'not supported' in text or 'unknown extended' in text
+
+
+class _SharedSshClient():
+  '''A SSH client shared by several SftpPConnection objects, each of them with its own SFTP channel. The client is closed, when the last of them is closed.'''
+
+  def __init__(self, client):
+    self.client = client
+    # Set to False, when the server refuses the copy-data extension.
+    self.copy_data_supported = True
+
+    self.__users = 1
+    self.__lock = threading.Lock()
+
+  def acquire(self):
+    with self.__lock:
+      self.__users += 1
+
+  def release(self):
+    with self.__lock:
+      self.__users -= 1
+      last = self.__users == 0
+
+    if last:
+      self.client.close()
+
+
+class sftp_transfer_profile():
+  '''Tuning of SFTP transfers of SftpPConnection. Attributes set to None keep defaults of paramiko.
+  Presets for typical links are SFTP_PROFILE_LAN, SFTP_PROFILE_WAN and SFTP_PROFILE_HIGH_LATENCY.'''
+
+  def __init__(self, **kwargs):
+    '''The constructor sets given attributes, the others keep their default values.'''
+    for name, value in kwargs.items():
+      if name.startswith('_') or not hasattr(sftp_transfer_profile, name):
+        raise AttributeError(f"sftp_transfer_profile doesn't have attribute {name}")
+
+      setattr(self, name, value)
+
+  window_size:int = None
+  '''Size of the window of the SSH channel (in bytes). It limits the amount of downloaded data in flight, so it should be at least the bandwidth-delay product of the link. (paramiko default is 2 MiB)'''
+  max_packet_size:int = None
+  '''Maximal size of a SSH packet of the channel (in bytes). (paramiko default is 32 KiB)'''
+
+  compress:bool = False
+  '''Enables compression of the SSH transport. It helps on slow links with compressible data and costs CPU time otherwise.'''
+
+  prefetch:bool = True
+  '''If True, downloads request the following blocks of a file before the previous ones arrive.'''
+
+  pipelined:bool = True
+  '''If True, uploads don't wait for the server response to each write request; errors are reported, when the file is closed.'''
+
+  buffer_size:int = 32768
+  '''Size of the buffer of remote files and of the blocks copied between local and remote files (in bytes).'''
+
+
+SFTP_PROFILE_LAN = sftp_transfer_profile(window_size=4 * 1024 ** 2, max_packet_size=32768, compress=False, buffer_size=1024 ** 2)
+'''A profile for fast links with low latency (up to a few ms).'''
+
+SFTP_PROFILE_WAN = sftp_transfer_profile(window_size=16 * 1024 ** 2, max_packet_size=32768, compress=True, buffer_size=1024 ** 2)
+'''A profile for slower links with latency of tens of ms. The transport is compressed.'''
+
+SFTP_PROFILE_HIGH_LATENCY = sftp_transfer_profile(window_size=64 * 1024 ** 2, max_packet_size=32768, compress=False, buffer_size=4 * 1024 ** 2)
+'''A profile for links with high bandwidth-delay product (eg. intercontinental links with latency of hundreds of ms).'''
 
 class SftpPConnection(abstract_pconnection.PConnection):
   '''Class for SFTP connection. Public interface with an exception of __init__ and close is inherited from PConnection.'''
 
-  def __init__(self, settings: pconnection_settings, host: str, username: str, password: str = None, keyfile : str = '~/.ssh/id_rsa', port: int = 22, no_host_key_checking: bool = False):
+  def __init__(self, settings: pconnection_settings, host: str, username: str, password: str = None, keyfile : str = '~/.ssh/id_rsa', port: int = 22, no_host_key_checking: bool = False, transfer_profile: sftp_transfer_profile = None):
     '''The constructor of SftpPConnection. Opens SFTP connection, when called. If None password is specified, the key authentication will be used. Otherwise the password authentication will be used.
     
     Args:
@@ -18,9 +103,18 @@ class SftpPConnection(abstract_pconnection.PConnection):
       password: Password for a SFTP connection. If None is provided, key authentication will be used.
       keyfile: A path to key file.
       no_host_key_checking: Specifies, whether remote host key should be verified or not.
+      transfer_profile: Tuning of transfers (eg. SFTP_PROFILE_WAN). If None, sftp_transfer_profile with default values is used.
     '''
     super().__init__(settings)
 
+    # Arguments needed to open the same connection again by clone.
+    self.__connect_args = dict(host=host, username=username, password=password, keyfile=keyfile, port=port, no_host_key_checking=no_host_key_checking,
+      transfer_profile=transfer_profile)
+
+    if transfer_profile is None:
+      transfer_profile = sftp_transfer_profile()
+    self.__profile = transfer_profile
+
     client = paramiko.SSHClient()    
 
     host_key_policy = None
@@ -37,26 +131,119 @@ class SftpPConnection(abstract_pconnection.PConnection):
     client.set_missing_host_key_policy(host_key_policy)
       
     if password == None:
-      client.connect(hostname=host, port=port, username=username, key_filename=keyfile)
+      client.connect(hostname=host, port=port, username=username, key_filename=keyfile, compress=transfer_profile.compress)
     else:
-      client.connect(hostname=host, port=port, username=username, password=password)
+      client.connect(hostname=host, port=port, username=username, password=password, compress=transfer_profile.compress)
 
-    self.__sftp = client.open_sftp()
+    self.__shared_client = _SharedSshClient(client)
+    self.__sftp = self.__open_channel()
+
+  def __open_channel(self):
+    return paramiko.SFTPClient.from_transport(self.__shared_client.client.get_transport(),
+      window_size=self.__profile.window_size, max_packet_size=self.__profile.max_packet_size)
 
   def close(self):
     self.__sftp.close()
+    self.__shared_client.release()
+
+  def clone(self):
+    '''Opens a new SFTP channel on the SSH transport of this connection, so no new SSH handshake and authentication is needed. The clone can be used by another thread concurrently with this connection.
+    The SSH transport is closed, when all connections sharing it are closed. If the server refuses to open another channel (eg. because of MaxSessions of OpenSSH), a new SSH connection is opened instead.
+
+    Returns:
+      A new SftpPConnection with the same settings.
+    '''
+    transport = self.__shared_client.client.get_transport()
+
+    if transport is not None and transport.is_active():
+      try:
+        clone = SftpPConnection.__new__(SftpPConnection)
+        abstract_pconnection.PConnection.__init__(clone, self.get_settings())
+
+        clone.__connect_args = self.__connect_args
+        clone.__profile = self.__profile
+        clone.__shared_client = self.__shared_client
+        clone.__sftp = self.__open_channel()
+
+        self.__shared_client.acquire()
+        return clone
+
+      except paramiko.SSHException as e:
+        logging.debug(f"Opening of a new SFTP channel failed ({e}), opening a new SSH connection instead.")
+
+    return SftpPConnection(self.get_settings(), **self.__connect_args)
   
   def _listdir(self, remote_path):
     return self.__sftp.listdir(path=remote_path)
 
+  def _scandir(self, remote_path):
+    return [(attr.filename, attr) for attr in self.__sftp.listdir_attr(path=remote_path)]
+
   def _rename(self, old_name, new_name):
     self.__sftp.rename(old_name, new_name) 
 
+  def _replace(self, old_name, new_name):
+    # posix-rename@openssh.com overwrites the target atomically.
+    try:
+      self.__sftp.posix_rename(old_name, new_name)
+    except IOError as e:
+      logging.debug(f"posix_rename of {old_name} failed ({e}), falling back to rename.")
+      super()._replace(old_name, new_name)
+
+  def _copy(self, old_name, new_name):
+    if self.__shared_client.copy_data_supported:
+      with self.__sftp.open(old_name, 'rb') as old_file, self.__sftp.open(new_name, 'wb') as new_file:
+        try:
+          # The copy-data extension copies the whole file (length 0) on the server side.
+          self.__sftp._request(CMD_EXTENDED, 'copy-data', old_file.handle, int64(0), int64(0), new_file.handle, int64(0))
+          return
+
+        except IOError as e:
+          # A failure of the copy itself (eg. a full disk) doesn't disable the extension.
+          if not _is_unsupported(e):
+            raise
+
+          logging.debug(f"The server doesn't support copy-data extension ({e}), falling back to streaming.")
+          self.__shared_client.copy_data_supported = False
+
+    super()._copy(old_name, new_name)
+
   def _push(self, local_path, remote_path):
-    self.__sftp.put(local_path, remote_path)
+    # Unlike sftp.put, no stat request is done to confirm the size.
+    with open(local_path, 'rb') as local_file, self._open(remote_path, 'wb') as remote_file:
+      shutil.copyfileobj(local_file, remote_file, self.__profile.buffer_size)
 
   def _pull(self, remote_path, local_path):
-    self.__sftp.get(remote_path, local_path)
+    with self.__open_prefetched(remote_path) as remote_file, open(local_path, 'wb') as local_file:
+      shutil.copyfileobj(remote_file, local_file, self.__profile.buffer_size)
+
+  def __open_prefetched(self, remote_path):
+    remote_file = self.__sftp.open(remote_path, 'rb', bufsize=self.__profile.buffer_size)
+
+    if self.__profile.prefetch:
+      remote_file.prefetch()
+
+    return remote_file
+
+  def _open(self, remote_path, mode):
+    remote_file = self.__sftp.open(remote_path, mode, bufsize=self.__profile.buffer_size)
+
+    if 'w' in mode or '+' in mode:
+      # Writes don't wait for a server response, errors are reported on close.
+      remote_file.set_pipelined(self.__profile.pipelined)
+
+    return remote_file
+
+  def _can_write_at_offset(self):
+    return True
+
+  def _read_bytes(self, remote_path):
+    with self.__open_prefetched(remote_path) as remote_file:
+      return remote_file.read()
+
+  def _write_bytes(self, remote_path, data):
+    # Confirmation would cost one more stat request.
+    self.__sftp.putfo(io.BytesIO(data), remote_path, confirm=False)
   
   def _isdir(self, remote_path):
     result = False
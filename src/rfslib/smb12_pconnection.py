@@ -1,9 +1,68 @@
 from smb.SMBConnection import SMBConnection
 
 from rfslib import abstract_pconnection, pconnection_settings
+from rfslib.ptranscoder import CHUNK_SIZE
 import socket
+import io
 from os.path import split
 
+
+class _Smb12File(io.RawIOBase):
+  '''Raw binary stream of a remote file. pysmb doesn't provide file handles, so every read or write is a separate request at an offset.'''
+
+  def __init__(self, smb, service_name, remote_path, mode):
+    self.__smb = smb
+    self.__service_name = service_name
+    self.__remote_path = remote_path
+    self.__mode = mode
+
+    self.__position = 0
+
+    if mode == 'wb':
+      # Creates the file or truncates it.
+      self.__smb.storeFileFromOffset(self.__service_name, self.__remote_path, io.BytesIO(), 0, truncate=True)
+
+  def readable(self):
+    return self.__mode == 'rb'
+
+  def writable(self):
+    return 'w' in self.__mode or '+' in self.__mode
+
+  def seekable(self):
+    return True
+
+  def readinto(self, b):
+    buffer = io.BytesIO()
+    self.__smb.retrieveFileFromOffset(self.__service_name, self.__remote_path, buffer, self.__position, len(b))
+
+    data = buffer.getvalue()
+    b[:len(data)] = data
+    self.__position += len(data)
+
+    return len(data)
+
+  def write(self, b):
+    self.__smb.storeFileFromOffset(self.__service_name, self.__remote_path, io.BytesIO(bytes(b)), self.__position)
+    self.__position += len(b)
+
+    return len(b)
+
+  def seek(self, offset, whence=io.SEEK_SET):
+    if whence == io.SEEK_SET:
+      self.__position = offset
+    elif whence == io.SEEK_CUR:
+      self.__position += offset
+    elif whence == io.SEEK_END:
+      self.__position = self.__smb.getAttributes(self.__service_name, self.__remote_path).file_size + offset
+    else:
+      raise ValueError(f"Invalid whence {whence}.")
+
+    return self.__position
+
+  def tell(self):
+    return self.__position
+
+
 class Smb12PConnection(abstract_pconnection.PConnection):
   '''Class for SMB connection version 1 or 2. Public interface with an exception of __init__ and close is inherited from PConnection.'''
   def __init__(self, settings: abstract_pconnection.pconnection_settings, 
@@ -24,6 +83,10 @@ class Smb12PConnection(abstract_pconnection.PConnection):
     '''
     super().__init__(settings)
 
+    # Arguments needed to open the same connection again by clone.
+    self.__connect_args = dict(host=host, service_name=service_name, username=username, password=password,
+      port=port, use_direct_tcp=use_direct_tcp, client_name=client_name, use_ntlm_v1=use_ntlm_v1)
+
     self.__service_name = service_name
     self.__smb = SMBConnection(username, password, client_name, host,
       use_ntlm_v2=not use_ntlm_v1, is_direct_tcp=use_direct_tcp)
@@ -38,11 +101,34 @@ class Smb12PConnection(abstract_pconnection.PConnection):
 
   def close(self):
     self.__smb.close()
+
+  def clone(self):
+    return Smb12PConnection(self.get_settings(), **self.__connect_args)
   
   def _listdir(self, remote_path):
     l = self.__smb.listPath(self.__service_name, remote_path)
     return map (lambda x: x.filename, l)
 
+  def _scandir(self, remote_path):
+    return self.__list_path(remote_path, '*')
+
+  def _scandir_pattern(self, remote_path, pattern):
+    if any(c in pattern for c in '<>"'):
+      # Other SMB wildcards would change the meaning of the pattern.
+      return None
+
+    # The pattern is matched by the server (case insensitively).
+    return self.__list_path(remote_path, pattern)
+
+  def __list_path(self, remote_path, pattern):
+    ret = []
+
+    for attr in self.__smb.listPath(self.__service_name, remote_path, pattern=pattern):
+      attr.st_mode_smb12 = self.__get_mode(attr)
+      ret.append((attr.filename, attr))
+
+    return ret
+
   def _rename(self, old_name, new_name):
     self.__smb.rename(self.__service_name, old_name, new_name) 
 
@@ -54,6 +140,25 @@ class Smb12PConnection(abstract_pconnection.PConnection):
     with open(local_path, "wb") as local_file:
       self.__smb.retrieveFile(self.__service_name, remote_path, local_file)
   
+  def _open(self, remote_path, mode):
+    raw = _Smb12File(self.__smb, self.__service_name, remote_path, mode)
+
+    if mode == 'rb':
+      return io.BufferedReader(raw, buffer_size=CHUNK_SIZE)
+    else:
+      return io.BufferedWriter(raw, buffer_size=CHUNK_SIZE)
+
+  def _can_write_at_offset(self):
+    return True
+
+  def _read_bytes(self, remote_path):
+    buffer = io.BytesIO()
+    self.__smb.retrieveFile(self.__service_name, remote_path, buffer)
+    return buffer.getvalue()
+
+  def _write_bytes(self, remote_path, data):
+    self.__smb.storeFile(self.__service_name, remote_path, io.BytesIO(data))
+
   def _isdir(self, remote_path):
     attr = self.__smb.getAttributes(self.__service_name, remote_path)
     return attr.isDirectory
@@ -54,6 +54,10 @@ class Smb23PConnection(abstract_pconnection.PConnection):
     '''
     super().__init__(settings)
 
+    # Arguments needed to open the same connection again by clone.
+    self.__connect_args = dict(host=host, service_name=service_name, username=username, password=password,
+      port=port, enable_encryption=enable_encryption, dont_require_signing=dont_require_signing)
+
     self.__service_name = service_name
     self.__host = host
 
@@ -64,6 +68,9 @@ class Smb23PConnection(abstract_pconnection.PConnection):
   def close(self):
     pass
 
+  def clone(self):
+    return Smb23PConnection(self.get_settings(), **self.__connect_args)
+
   def __prefix_path(self, path):
     return '\\\\' + self.__host + '\\' + self.__service_name + '\\' + path
 
@@ -71,12 +78,42 @@ class Smb23PConnection(abstract_pconnection.PConnection):
     p_remote_path = self.__prefix_path(remote_path)
     return smb.listdir(p_remote_path)
 
+  def _scandir(self, remote_path):
+    p_remote_path = self.__prefix_path(remote_path)
+
+    # Attributes of entries are returned by the directory query itself.
+    return [(entry.name, entry.stat(follow_symlinks=False)) for entry in smb.scandir(p_remote_path)]
+
+  def _scandir_pattern(self, remote_path, pattern):
+    if any(c in pattern for c in '<>"'):
+      # Other SMB wildcards would change the meaning of the pattern.
+      return None
+
+    p_remote_path = self.__prefix_path(remote_path)
+
+    # The pattern is sent to the server as the search pattern of QUERY_DIRECTORY request.
+    return [(entry.name, entry.stat(follow_symlinks=False)) for entry in smb.scandir(p_remote_path, search_pattern=pattern)]
+
   def _rename(self, old_name, new_name):
     p_old_name = self.__prefix_path(old_name)
     p_new_name = self.__prefix_path(new_name)
     
     smb.rename(p_old_name, p_new_name)
 
+  def _replace(self, old_name, new_name):
+    p_old_name = self.__prefix_path(old_name)
+    p_new_name = self.__prefix_path(new_name)
+
+    # The rename is sent with ReplaceIfExists flag set.
+    smb.replace(p_old_name, p_new_name)
+
+  def _copy(self, old_name, new_name):
+    p_old_name = self.__prefix_path(old_name)
+    p_new_name = self.__prefix_path(new_name)
+
+    # The data are copied on the server side by FSCTL_SRV_COPYCHUNK.
+    smb.copyfile(p_old_name, p_new_name)
+
   def _push(self, local_path, remote_path):
     p_remote_path = self.__prefix_path(remote_path)
 
@@ -89,6 +126,14 @@ class Smb23PConnection(abstract_pconnection.PConnection):
     with smb.open_file(p_remote_path, "rb") as remote_file, open(local_path, "wb") as local_file:
       shutil.copyfileobj(remote_file, local_file)
   
+  def _open(self, remote_path, mode):
+    p_remote_path = self.__prefix_path(remote_path)
+
+    return smb.open_file(p_remote_path, mode)
+
+  def _can_write_at_offset(self):
+    return True
+
   def _isdir(self, remote_path):
     p_remote_path = self.__prefix_path(remote_path)
 
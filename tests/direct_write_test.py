@@ -0,0 +1,30 @@
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+def test_direct_write_push(tmp_path):
+  local = tmp_path / 'local'
+  local.write_text('new')
+  remote = tmp_path / 'remote'
+  remote.write_text('old content')
+
+  conn = CountingFsPConnection(make_settings(direct_write=True))
+  conn.push(str(local), str(remote))
+
+  assert remote.read_text() == 'new'
+  assert conn.calls['_rename'] == 0
+  assert sorted(p.name for p in tmp_path.iterdir()) == ['local', 'remote']
+
+
+def test_push_replaces_target_atomically(tmp_path):
+  local = tmp_path / 'local'
+  local.write_text('new')
+  remote = tmp_path / 'remote'
+  remote.write_text('old content')
+
+  conn = CountingFsPConnection(make_settings())
+  conn.push(str(local), str(remote))
+
+  assert remote.read_text() == 'new'
+  assert conn.calls['_replace'] == 1
+  assert conn.calls['_unlink'] == conn.calls['_rename'] == 0
+  assert sorted(p.name for p in tmp_path.iterdir()) == ['local', 'remote']
@@ -0,0 +1,40 @@
+from collections import Counter
+
+from rfslib import pconnection_settings
+from rfslib.fs_pconnection import FsPConnection
+
+
+PRIMITIVES = ('_stat', '_lstat', '_listdir', '_scandir', '_rename', '_replace', '_copy', '_push', '_pull', '_isdir', '_mkdir', '_rmdir', '_unlink', '_exists', '_lexists')
+
+
+class CountingFsPConnection(FsPConnection):
+  '''FsPConnection, which counts calls of protected primitives (each of them is a round trip on a real remote storage).'''
+
+  def __init__(self, settings):
+    super().__init__(settings)
+    self.calls = Counter()
+
+  def __getattribute__(self, name):
+    attr = super().__getattribute__(name)
+
+    if name in PRIMITIVES:
+      calls = super().__getattribute__('calls')
+
+      def counted(*args, **kwargs):
+        calls[name] += 1
+        return attr(*args, **kwargs)
+
+      return counted
+
+    return attr
+
+  def round_trips(self):
+    return sum(self.calls.values())
+
+
+def make_settings(**kwargs):
+  settings = pconnection_settings()
+  for key, value in kwargs.items():
+    setattr(settings, key, value)
+
+  return settings
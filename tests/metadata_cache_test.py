@@ -0,0 +1,70 @@
+import os
+import time
+
+from rfslib.pmetadata_cache import PMetadataCache
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+def make_connection(metadata_cache):
+  return CountingFsPConnection(make_settings(metadata_cache=metadata_cache))
+
+
+def test_cache_ttl_and_lru():
+  cache = PMetadataCache(ttl=0.05, max_size=2)
+
+  cache.put('exists', '/a', True)
+  cache.put('exists', '/b', False)
+  assert cache.get('exists', '/b') == (True, False)
+
+  cache.put('exists', '/c', True)
+  assert cache.get('exists', '/a') == (False, None)
+  assert len(cache) == 2
+
+  time.sleep(0.1)
+  assert cache.get('exists', '/c') == (False, None)
+
+
+def test_cache_recursive_invalidation():
+  cache = PMetadataCache(ttl=60, max_size=10)
+
+  cache.put('isdir', '/a', True)
+  cache.put('isdir', '/a/b', False)
+  cache.put('isdir', '/ab', False)
+
+  cache.invalidate('/a', recursive=True)
+  assert cache.get('isdir', '/a/b') == (False, None)
+  assert cache.get('isdir', '/ab') == (True, False)
+
+
+def test_cache_saves_round_trips(tmp_path):
+  counts = []
+  for metadata_cache in (False, True):
+    conn = make_connection(metadata_cache)
+    remote = str(tmp_path / f'dir{metadata_cache}')
+
+    conn.mkdir(remote)
+    conn.listdir(remote)
+    conn.write_bytes(remote + '/file', b'data')
+    conn.stat(remote + '/file')
+    counts.append(conn.round_trips())
+
+  assert counts[1] < counts[0]
+
+
+def test_cache_invalidated_by_writes(tmp_path):
+  conn = make_connection(True)
+  remote = str(tmp_path / 'dir')
+
+  assert not conn.exists(remote)
+  conn.mkdir(remote)
+  assert conn.isdir(remote)
+
+  conn.rmdir(remote)
+  assert not conn.exists(remote)
+
+  # Changes done behind the back of the connection are visible after an explicit invalidation.
+  os.mkdir(remote)
+  assert not conn.exists(remote)
+  conn.clear_metadata_cache(remote)
+  assert conn.exists(remote)
@@ -0,0 +1,136 @@
+import threading
+import time
+
+import pytest
+
+from rfslib.pconnection_pool import PConnectionPool
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+class BreakableFsPConnection(CountingFsPConnection):
+  broken = False
+
+  def is_alive(self):
+    return not self.broken
+
+
+def make_pool(**kwargs):
+  opened = []
+
+  def factory():
+    connection = BreakableFsPConnection(make_settings())
+    opened.append(connection)
+    return connection
+
+  return PConnectionPool(factory, **kwargs), opened
+
+
+def test_checkout_reuse_and_growth():
+  pool, opened = make_pool(min_size=1, max_size=2)
+  assert len(opened) == 1
+
+  with pool.connection() as first:
+    assert first is opened[0]
+
+    with pool.connection() as second:
+      assert second is not first and len(pool) == 2
+
+      with pytest.raises(TimeoutError):
+        pool.checkout(timeout=0.05)
+      assert pool.checkout(block=False) is None
+
+  with pool.connection() as again:
+    assert again in opened
+  assert len(opened) == 2
+
+
+def test_blocked_checkout_gets_returned_connection():
+  pool, opened = make_pool(min_size=1, max_size=1)
+  connection = pool.checkout()
+
+  threading.Timer(0.05, pool.checkin, args=(connection,)).start()
+  assert pool.checkout(timeout=5) is connection
+
+
+def test_health_check_and_eviction():
+  pool, opened = make_pool(min_size=0, max_size=2, check_after=0)
+
+  with pool.connection() as connection:
+    connection.broken = True
+
+  with pool.connection() as replacement:
+    assert replacement is not connection
+  assert len(pool) == 1
+
+  pool, opened = make_pool(min_size=1, max_size=3, max_idle=0.01)
+  connections = [pool.checkout() for i in range(3)]
+  for connection in connections:
+    pool.checkin(connection)
+
+  time.sleep(0.05)
+  pool.checkout()
+  assert len(pool) == 1
+
+
+def test_dispatch(tmp_path):
+  pool, opened = make_pool(min_size=1, max_size=4)
+  (tmp_path / 'dir' / 'sub').mkdir(parents=True)
+
+  pool.write_text(str(tmp_path / 'dir' / 'a'), 'data')
+  assert pool.read_text(str(tmp_path / 'dir' / 'a')) == 'data'
+  assert sorted(pool.listdir(str(tmp_path / 'dir'))) == ['a', 'sub']
+
+  with pool.open(str(tmp_path / 'dir' / 'a')) as f:
+    assert f.read() == b'data'
+
+  walk = pool.walk(str(tmp_path / 'dir'))
+  next(walk)
+  other = pool.checkout(block=False)
+  assert other is not None
+  pool.checkin(other)
+  walk.close()
+
+  with pytest.raises(FileNotFoundError):
+    pool.stat(str(tmp_path / 'missing'))
+
+  with pytest.raises(AttributeError):
+    pool._stat
+
+  # Worker connections of a member are taken from the pool.
+  assert len(pool.find(str(tmp_path / 'dir'), workers=3)) == 3
+  assert len(opened) <= 4
+
+  pool.close()
+
+
+def test_failed_write_keeps_target(tmp_path):
+  pool, opened = make_pool(min_size=1, max_size=1)
+  target = tmp_path / 'a'
+  target.write_bytes(b'original')
+
+  with pytest.raises(RuntimeError):
+    with pool.open(str(target), 'wb') as f:
+      f.write(b'partial')
+      raise RuntimeError()
+
+  assert target.read_bytes() == b'original'
+  assert sorted(p.name for p in tmp_path.iterdir()) == ['a']
+
+  # The connection was returned to the pool.
+  with pool.connection(timeout=0.1):
+    pass
+
+
+def test_members_share_metadata_cache(tmp_path):
+  pool = PConnectionPool(lambda: CountingFsPConnection(make_settings(metadata_cache=True)), min_size=2, max_size=2)
+  remote = str(tmp_path / 'remote')
+
+  with pool.connection() as first, pool.connection() as second:
+    assert not second.exists(remote)
+
+    first.write_bytes(remote, b'data')
+    assert second.exists(remote) and second.stat(remote).st_size == 4
+
+    first.unlink(remote)
+    assert not second.exists(remote)
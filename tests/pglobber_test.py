@@ -0,0 +1,106 @@
+import fnmatch
+import glob
+import os
+
+from rfslib.pglobber import PGlobber
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+PATTERNS = ['*', '*/', 'data/*', 'data/2024-*/**/*.csv', 'data/**', 'data/**/', '**/*.csv', 'data/2024-0[12]/x.csv',
+  'data/.hidden/*', 'data/.*', 'data/*/sub/deep.csv', 'data/2024-01/../2024-02/y.csv', 'data/missing/*', 'dat?/2024-01/', 'data/2024-01/x.csv',
+  '**/sub/**', '*/sub/**', 'data/*/sub/**/']
+
+
+def make_tree(root):
+  for name in ('data/2024-01/x.csv', 'data/2024-01/x.txt', 'data/2024-01/sub/deep.csv', 'data/2024-02/y.csv', 'data/2023-12/z.csv',
+      'data/.hidden/h.csv', 'data/.dot.csv'):
+    (root / name).parent.mkdir(parents=True, exist_ok=True)
+    (root / name).write_text(name)
+
+  os.symlink('2024-01', root / 'data' / '2024-link')
+
+
+def test_glob_matches_cpython(tmp_path):
+  make_tree(tmp_path)
+  globber = PGlobber(CountingFsPConnection(make_settings()))
+
+  for pattern in PATTERNS:
+    expected = glob.glob(str(tmp_path / pattern), recursive=True) or [str(tmp_path / pattern)]
+    assert sorted(globber.glob(str(tmp_path / pattern))) == sorted(set(expected)), pattern
+
+  # CPython yields the directory of a trailing '**' even if it doesn't exist.
+  for pattern in ('data/missing/**', 'data/2024-01/x.csv/**'):
+    assert globber.glob(str(tmp_path / pattern)) == [str(tmp_path / pattern)]
+
+
+def test_glob_prunes_and_uses_listings(tmp_path):
+  make_tree(tmp_path)
+  conn = CountingFsPConnection(make_settings())
+  globber = PGlobber(conn)
+
+  # Only the literal path is checked.
+  assert globber.glob(str(tmp_path / 'data' / '2024-01' / 'x.csv')) == [str(tmp_path / 'data' / '2024-01' / 'x.csv')]
+  assert conn.calls['_listdir'] == 0 and conn.round_trips() <= 2
+
+  conn = CountingFsPConnection(make_settings(skip_validation=True))
+  globber = PGlobber(conn)
+  result = globber.glob(str(tmp_path / 'data' / '2024-*' / '*.csv'))
+
+  assert sorted(result) == [str(tmp_path / 'data' / name) for name in ('2024-01/x.csv', '2024-02/y.csv', '2024-link/x.csv')]
+  # 2023-12 and the files of data aren't descended into, only the symlink is resolved by a separate request.
+  assert conn.calls['_lexists'] == conn.calls['_stat'] == conn.calls['_lstat'] == 0
+  assert conn.calls['_isdir'] == 1
+
+
+def test_glob_many_lists_shared_directories_once(tmp_path):
+  make_tree(tmp_path)
+  patterns = [str(tmp_path / pattern) for pattern in ('data/2024-01/*.csv', 'data/2024-01/*.txt', 'data/2024-*/**/*.csv', 'data/nothing*')]
+
+  conn = CountingFsPConnection(make_settings())
+  results = PGlobber(conn).glob_many(patterns)
+  listings = conn.calls['_scandir']
+
+  assert results == [PGlobber(conn).glob(pattern) for pattern in patterns]
+  assert results[3] == [patterns[3]]
+  # data, 2024-01, 2024-01/sub, 2024-02 and 2024-link (and 2024-link/sub) are listed once for all patterns.
+  assert listings == 6
+
+
+class PatternFsPConnection(CountingFsPConnection):
+  '''FsPConnection, which filters listings case insensitively like a SMB server.'''
+
+  def __init__(self, settings):
+    super().__init__(settings)
+    self.patterns = []
+
+  def _scandir_pattern(self, remote_path, pattern):
+    self.patterns.append(pattern)
+    return [(name, stat) for name, stat in self._scandir(remote_path) if fnmatch.fnmatch(name.lower(), pattern.lower())]
+
+
+def test_glob_passes_pattern_to_server(tmp_path):
+  for name in ('ABC_1.dat', 'abc_2.DAT', 'XYZ.dat', '.ABC_h.dat'):
+    (tmp_path / name).write_text(name)
+
+  conn = PatternFsPConnection(make_settings())
+  globber = PGlobber(conn)
+
+  assert globber.glob(str(tmp_path / 'ABC_*.dat')) == [str(tmp_path / 'ABC_1.dat')]
+  assert globber.glob(str(tmp_path / '*')) != []
+  assert conn.patterns == ['ABC_*.dat']
+
+
+def test_iglob_is_lazy(tmp_path):
+  make_tree(tmp_path)
+  conn = CountingFsPConnection(make_settings())
+
+  matches = PGlobber(conn).iglob(str(tmp_path / 'data' / '**'))
+  assert next(matches) == str(tmp_path / 'data') + '/'
+  assert conn.calls['_scandir'] == 0
+
+  next(matches)
+  assert conn.calls['_scandir'] == 1
+  matches.close()
+
+  assert list(PGlobber(conn).iglob(str(tmp_path / 'nothing*'))) == []
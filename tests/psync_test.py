@@ -0,0 +1,72 @@
+import os
+
+import pytest
+
+from rfslib.psync import PSync
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+def make_tree(root):
+  (root / 'sub' / 'deep').mkdir(parents=True)
+  (root / 'a.txt').write_text('a')
+  (root / 'sub' / 'b.txt').write_text('bb')
+  (root / 'sub' / 'deep' / 'c.txt').write_text('ccc')
+
+
+def snapshot(root):
+  return {str(p.relative_to(root)): p.read_bytes() if p.is_file() else None for p in root.rglob('*')}
+
+
+@pytest.mark.parametrize('direction', ['push', 'pull'])
+def test_sync_transfers_only_changes(tmp_path, direction):
+  src = tmp_path / 'src'
+  dst = tmp_path / 'dst'
+  make_tree(src)
+
+  sync = PSync(CountingFsPConnection(make_settings()))
+
+  plan = sync.sync(str(src), str(dst), direction)
+  assert plan.count('transfer') == 3 and plan.count('mkdir') == 3
+  assert plan.stats.files == 3 and plan.stats.bytes == 6
+  assert snapshot(dst) == snapshot(src)
+
+  assert sync.sync(str(src), str(dst), direction).actions == []
+
+  (src / 'sub' / 'b.txt').write_text('changed')
+  (dst / 'extra').mkdir()
+  (dst / 'extra' / 'x').write_text('x')
+
+  plan = sync.sync(str(src), str(dst), direction, delete=True, dry_run=True)
+  assert [str(action) for action in plan.actions] == ['transfer sub/b.txt (size)', 'delete extra (extraneous)']
+  assert plan.stats is None and (dst / 'extra').exists()
+
+  sync.apply(plan)
+  assert snapshot(dst) == snapshot(src)
+
+
+def test_sync_compares_mtime_and_checksum(tmp_path):
+  src = tmp_path / 'src'
+  dst = tmp_path / 'dst'
+  make_tree(src)
+
+  sync = PSync(CountingFsPConnection(make_settings()))
+  sync.sync(str(src), str(dst), 'pull')
+
+  # The pulled files get the modification time of the remote ones.
+  assert os.stat(dst / 'a.txt').st_mtime == os.stat(src / 'a.txt').st_mtime
+
+  (src / 'a.txt').write_text('b')
+  os.utime(src / 'a.txt', (0, os.stat(src / 'a.txt').st_mtime + 60))
+
+  assert [action.reason for action in sync.plan(str(src), str(dst), 'pull').actions] == ['mtime']
+  assert [action.reason for action in sync.plan(str(src), str(dst), 'pull', compare='checksum').actions] == ['checksum']
+  assert sync.plan(str(src), str(dst), 'pull', compare=('size',)).actions == []
+
+  (dst / 'sub' / 'b.txt').unlink()
+  (dst / 'sub' / 'b.txt').mkdir()
+  with pytest.raises(InterruptedError):
+    sync.plan(str(src), str(dst), 'pull')
+
+  sync.sync(str(src), str(dst), 'pull', delete=True)
+  assert snapshot(dst) == snapshot(src)
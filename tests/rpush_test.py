@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from rfslib.pexecutor import PExecutor
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+def make_local_tree(root, files=12):
+  for i in range(files):
+    directory = root / 'local' / f'd{i % 3}' / f'e{i % 2}'
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f'f{i}').write_text(str(i))
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_rpush_tree(tmp_path, workers):
+  make_local_tree(tmp_path)
+  conn = CountingFsPConnection(make_settings(metadata_cache=True))
+  remote = str(tmp_path / 'remote')
+
+  conn.rpush(str(tmp_path / 'local'), remote, workers=workers)
+
+  for i in range(12):
+    assert (tmp_path / 'remote' / f'd{i % 3}' / f'e{i % 2}' / f'f{i}').read_text() == str(i)
+
+  # The remote tree was created by rpush, so no file needed a check.
+  assert conn.calls['_isdir'] == 0
+
+  # Pushing again overwrites the files in existing directories.
+  (tmp_path / 'local' / 'd0' / 'e0' / 'f0').write_text('new')
+  conn.rpush(str(tmp_path / 'local'), remote, workers=workers)
+  assert (tmp_path / 'remote' / 'd0' / 'e0' / 'f0').read_text() == 'new'
+  assert sorted(os.listdir(tmp_path / 'remote' / 'd0' / 'e0')) == ['f0', 'f6']
+
+
+def test_rpush_conflict(tmp_path):
+  make_local_tree(tmp_path)
+  (tmp_path / 'remote' / 'd1' / 'e1' / 'f1').mkdir(parents=True)
+  conn = CountingFsPConnection(make_settings())
+
+  with pytest.raises(InterruptedError):
+    conn.rpush(str(tmp_path / 'local'), str(tmp_path / 'remote'), workers=3)
+
+
+def test_executor_reports_earliest_failure():
+  done = []
+
+  def function(resource, task):
+    if task in (5, 7):
+      raise ValueError(task)
+    done.append(task)
+
+  with pytest.raises(ValueError) as error:
+    PExecutor([None] * 4, queue_size=2).run(function, range(1000))
+
+  assert error.value.args == (5,)
+  # The remaining tasks were cancelled.
+  assert len(done) < 100
@@ -0,0 +1,42 @@
+import os
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+def make_tree(root):
+  (root / 'dir' / 'sub').mkdir(parents=True)
+  (root / 'dir' / 'a').write_text('a')
+  (root / 'dir' / 'sub' / 'b').write_text('bb')
+  os.symlink('sub', root / 'dir' / 'link')
+
+
+def test_scandir_entries(tmp_path):
+  make_tree(tmp_path)
+  conn = CountingFsPConnection(make_settings())
+
+  entries = {entry.name: entry for entry in conn.scandir(str(tmp_path / 'dir'))}
+
+  assert sorted(entries) == ['a', 'link', 'sub']
+  assert entries['sub'].is_dir() and not entries['sub'].is_symlink()
+  assert entries['a'].is_file() and entries['a'].stat().st_size == 1
+  assert entries['link'].is_symlink() and entries['link'].is_dir() and not entries['link'].is_dir(follow_symlinks=False)
+  assert entries['a'].path == str(tmp_path / 'dir' / 'a')
+
+  assert conn.calls['_listdir'] == 0
+
+
+def test_rpull_and_dcp_use_listing_attributes(tmp_path):
+  make_tree(tmp_path)
+  (tmp_path / 'copy').mkdir()
+  conn = CountingFsPConnection(make_settings())
+
+  conn.rpull(str(tmp_path / 'dir'), str(tmp_path / 'pulled'))
+  assert (tmp_path / 'pulled' / 'sub' / 'b').read_text() == 'bb'
+  assert conn.calls['_isdir'] <= 3
+
+  conn.dcp([str(tmp_path / 'dir')], str(tmp_path / 'copy'), recursive=True)
+  assert (tmp_path / 'copy' / 'dir' / 'sub' / 'b').read_text() == 'bb'
+  assert (tmp_path / 'copy' / 'dir' / 'link' / 'b').read_text() == 'bb'
+
+  conn.dmv([str(tmp_path / 'pulled')], str(tmp_path / 'copy'))
+  assert (tmp_path / 'copy' / 'pulled' / 'a').read_text() == 'a'
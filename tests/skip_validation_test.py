@@ -0,0 +1,101 @@
+import pytest
+
+from rfslib.fs_pconnection import FsPConnection
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+def make_connection(skip_validation):
+  return CountingFsPConnection(make_settings(skip_validation=skip_validation))
+
+
+@pytest.mark.parametrize('operation', ['push', 'pull', 'mkdir', 'rename', 'unlink', 'ls'])
+def test_skip_validation_saves_round_trips(tmp_path, operation):
+  round_trips = []
+
+  for skip_validation in (False, True):
+    workdir = tmp_path / str(skip_validation)
+    workdir.mkdir()
+    (workdir / 'file').write_text('data')
+
+    conn = make_connection(skip_validation)
+    file = str(workdir / 'file')
+
+    if operation == 'push':
+      conn.push(file, str(workdir / 'pushed'))
+    elif operation == 'pull':
+      conn.pull(file, str(workdir / 'pulled'))
+    elif operation == 'mkdir':
+      conn.mkdir(str(workdir / 'dir'))
+    elif operation == 'rename':
+      conn.rename(file, str(workdir / 'renamed'))
+    elif operation == 'unlink':
+      conn.unlink(file)
+    elif operation == 'ls':
+      assert conn.ls(str(workdir)) == ['file']
+
+    round_trips.append(conn.round_trips())
+
+  assert round_trips[1] < round_trips[0]
+
+
+def test_skip_validation_keeps_exception_types(tmp_path):
+  conn = make_connection(True)
+  (tmp_path / 'dir').mkdir()
+  (tmp_path / 'file').write_text('data')
+
+  with pytest.raises(FileNotFoundError):
+    conn.unlink(str(tmp_path / 'missing'))
+
+  with pytest.raises(IsADirectoryError):
+    conn.pull(str(tmp_path / 'dir'), str(tmp_path / 'pulled'))
+
+  with pytest.raises(NotADirectoryError):
+    conn.listdir(str(tmp_path / 'file'))
+
+  assert conn.ls(str(tmp_path / 'file')) == ['file']
+
+
+class RenamingFsPConnection(CountingFsPConnection):
+  '''CountingFsPConnection, which uses the default _replace built on _rename and _unlink.'''
+
+  def _rename(self, old_name, new_name):
+    if self._lexists(new_name):
+      raise FileExistsError(new_name)
+
+    super()._rename(old_name, new_name)
+
+  def _replace(self, old_name, new_name):
+    super(FsPConnection, self)._replace(old_name, new_name)
+
+
+def test_replace_keeps_target_of_missing_source(tmp_path):
+  (tmp_path / 'existing').write_text('data')
+  conn = RenamingFsPConnection(make_settings(skip_validation=True))
+
+  with pytest.raises(FileNotFoundError):
+    conn.fmv(str(tmp_path / 'missing'), str(tmp_path / 'existing'))
+
+  assert (tmp_path / 'existing').read_text() == 'data'
+
+  (tmp_path / 'file').write_text('new')
+  conn.fmv(str(tmp_path / 'file'), str(tmp_path / 'existing'))
+  assert (tmp_path / 'existing').read_text() == 'new' and not (tmp_path / 'file').exists()
+
+
+@pytest.mark.parametrize('operation', ['push', 'fcp', 'write_bytes'])
+def test_failed_replace_removes_tmp_file(tmp_path, operation):
+  (tmp_path / 'file').write_text('data')
+  (tmp_path / 'dir' / 'subdir').mkdir(parents=True)
+  conn = make_connection(True)
+  target = str(tmp_path / 'dir' / 'subdir')
+
+  with pytest.raises(IsADirectoryError):
+    if operation == 'push':
+      conn.push(str(tmp_path / 'file'), target)
+    elif operation == 'fcp':
+      conn.fcp(str(tmp_path / 'file'), target)
+    elif operation == 'write_bytes':
+      conn.write_bytes(target, b'data')
+
+  assert [p.name for p in (tmp_path / 'dir').iterdir()] == ['subdir']
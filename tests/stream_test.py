@@ -0,0 +1,65 @@
+import os
+
+import pytest
+
+from rfslib.fs_pconnection import FsPConnection
+
+from fs_helpers import make_settings
+
+
+def test_binary_stream(tmp_path):
+  conn = FsPConnection(make_settings())
+  remote = str(tmp_path / 'remote')
+
+  with conn.open(remote, 'wb') as f:
+    f.write(b'0123456789')
+
+  with conn.open(remote, 'rb') as f:
+    f.seek(5)
+    assert f.read() == b'56789'
+
+  assert os.listdir(tmp_path) == ['remote']
+
+
+def test_text_transmission_streams(tmp_path):
+  conn = FsPConnection(make_settings(text_transmission=True, remote_encoding='cp1250', remote_crlf=True))
+  remote = str(tmp_path / 'remote')
+
+  with conn.open(remote, 'w') as f:
+    f.write('kůň\núpěl\n')
+  assert (tmp_path / 'remote').read_bytes() == 'kůň\r\núpěl\r\n'.encode('cp1250')
+
+  with conn.open(remote, 'rb') as f:
+    assert f.read() == 'kůň\núpěl\n'.encode('utf8')
+
+  with conn.open(remote, 'r') as f:
+    assert list(f) == ['kůň\n', 'úpěl\n']
+
+
+def test_failed_write_keeps_target(tmp_path):
+  conn = FsPConnection(make_settings())
+  (tmp_path / 'remote').write_bytes(b'old')
+
+  with pytest.raises(RuntimeError):
+    with conn.open(str(tmp_path / 'remote'), 'wb') as f:
+      f.write(b'new')
+      raise RuntimeError()
+
+  assert os.listdir(tmp_path) == ['remote']
+  assert (tmp_path / 'remote').read_bytes() == b'old'
+
+
+def test_read_write_bytes_and_text(tmp_path):
+  conn = FsPConnection(make_settings(text_transmission=True, remote_encoding='cp1250', remote_crlf=True))
+  remote = str(tmp_path / 'remote')
+
+  conn.write_bytes(remote, 'kůň\n'.encode('utf8'))
+  assert (tmp_path / 'remote').read_bytes() == 'kůň\r\n'.encode('cp1250')
+  assert conn.read_bytes(remote) == 'kůň\n'.encode('utf8')
+
+  conn.write_text(remote, 'úpěl\n')
+  assert conn.read_text(remote) == 'úpěl\n'
+
+  conn.touch(remote)
+  assert conn.read_bytes(remote) == b''
+  assert os.listdir(tmp_path) == ['remote']
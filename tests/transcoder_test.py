@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from rfslib.ptranscoder import PTranscoder
+
+
+def transcode_in_chunks(transcoder, data, chunk_size):
+  out = io.BytesIO()
+  transcoder.copy(io.BytesIO(data), out, chunk_size=chunk_size)
+  return out.getvalue()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 7, 1024])
+def test_split_characters_and_crlf(chunk_size):
+  text = 'Příliš žluťoučký kůň\r\núpěl\r\rďábelské ódy\r\n'
+  data = text.encode('utf8')
+
+  transcoder = PTranscoder('utf8', 'cp1250', from_crlf=True, to_crlf=False)
+  assert transcode_in_chunks(transcoder, data, chunk_size) == text.replace('\r\n', '\n').encode('cp1250')
+
+  transcoder = PTranscoder('cp1250', 'utf8', from_crlf=False, to_crlf=True)
+  data = text.replace('\r\n', '\n').encode('cp1250')
+  assert transcode_in_chunks(transcoder, data, chunk_size) == text.replace('\r\n', '\n').replace('\n', '\r\n').encode('utf8')
+
+
+def test_trailing_cr_is_kept():
+  transcoder = PTranscoder('utf8', 'utf8', from_crlf=True)
+  assert transcode_in_chunks(transcoder, b'a\r', 1) == b'a\r'
+
+
+def test_incomplete_character_fails():
+  transcoder = PTranscoder('utf8', 'cp1250')
+
+  with pytest.raises(UnicodeDecodeError):
+    transcode_in_chunks(transcoder, 'ž'.encode('utf8')[:1], 1024)
+
+
+@pytest.mark.parametrize('from_encoding, to_encoding', [
+  ('utf8', 'UTF-8'), ('cp1250', 'cp1250'), ('cp1250', 'iso8859-2'), ('latin1', 'cp1252'), ('utf8', 'cp1250'), ('cp1250', 'utf16')])
+@pytest.mark.parametrize('from_crlf, to_crlf', [(False, False), (False, True), (True, False), (True, True)])
+def test_fast_paths_match_unicode_path(from_encoding, to_encoding, from_crlf, to_crlf):
+  text = 'žluťoučký kůň\r\núpěl\n\r\n' if 'latin1' not in from_encoding else 'déjà vu\r\n\n'
+  data = text.encode(from_encoding)
+
+  expected = text
+  if from_crlf and not to_crlf:
+    expected = expected.replace('\r\n', '\n')
+  elif to_crlf and not from_crlf:
+    expected = expected.replace('\n', '\r\n')
+
+  for chunk_size in (1, 5, 1024):
+    transcoder = PTranscoder(from_encoding, to_encoding, from_crlf, to_crlf)
+    assert transcode_in_chunks(transcoder, data, chunk_size) == expected.encode(to_encoding)
+
+
+def test_byte_table_rejects_unmappable_characters():
+  transcoder = PTranscoder('cp1250', 'latin1')
+
+  with pytest.raises(UnicodeEncodeError):
+    transcoder.transcode('ř'.encode('cp1250'))
+
+  with pytest.raises(UnicodeDecodeError):
+    transcoder.transcode(b'\x81')
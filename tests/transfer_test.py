@@ -0,0 +1,208 @@
+import errno
+import os
+import threading
+import time
+
+import pytest
+
+from rfslib import fs_pconnection
+from rfslib.abstract_pconnection import PConnection
+from rfslib.fs_pconnection import FsPConnection
+from rfslib.ptranscoder import CHUNK_SIZE
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+TEXT = 'žluťoučký kůň\núpěl\n'
+
+
+def test_push_pull_without_transcoding(tmp_path):
+  conn = FsPConnection(make_settings())
+  (tmp_path / 'local').write_bytes(b'\x00\x01binary')
+
+  conn.push(str(tmp_path / 'local'), str(tmp_path / 'remote'))
+  conn.pull(str(tmp_path / 'remote'), str(tmp_path / 'pulled'))
+
+  assert (tmp_path / 'pulled').read_bytes() == b'\x00\x01binary'
+  assert sorted(os.listdir(tmp_path)) == ['local', 'pulled', 'remote']
+
+
+def test_push_pull_with_transcoding(tmp_path):
+  conn = FsPConnection(make_settings(text_transmission=True, remote_encoding='cp1250', remote_crlf=True))
+  (tmp_path / 'local').write_text(TEXT, encoding='utf8')
+
+  conn.push(str(tmp_path / 'local'), str(tmp_path / 'remote'))
+  assert (tmp_path / 'remote').read_bytes() == TEXT.replace('\n', '\r\n').encode('cp1250')
+
+  conn.pull(str(tmp_path / 'remote'), str(tmp_path / 'pulled'))
+  assert (tmp_path / 'pulled').read_bytes() == TEXT.encode('utf8')
+
+  assert sorted(os.listdir(tmp_path)) == ['local', 'pulled', 'remote']
+
+
+def test_parallel_rpull(tmp_path):
+  for i in range(10):
+    directory = tmp_path / 'remote' / f'd{i % 3}' / f'e{i % 2}'
+    directory.mkdir(parents=True, exist_ok=True)
+    (directory / f'f{i}').write_text('x' * i)
+
+  for workers in (1, 4):
+    conn = FsPConnection(make_settings())
+    target = tmp_path / f'local{workers}'
+
+    stats = conn.rpull(str(tmp_path / 'remote'), str(target), workers=workers)
+
+    assert (stats.files, stats.bytes) == (10, sum(range(10)))
+    assert stats.bytes_per_second() > 0
+    for i in range(10):
+      assert (target / f'd{i % 3}' / f'e{i % 2}' / f'f{i}').read_text() == 'x' * i
+
+    # No temporary file is left behind.
+    assert sum(len(files) for _, _, files in os.walk(target)) == 10
+
+
+class SlowListingFsPConnection(FsPConnection):
+  '''FsPConnection, whose listings take some time, so concurrent listings overlap. Clones share the counters.'''
+
+  lock = threading.Lock()
+  listing = 0
+  max_listing = 0
+
+  def _scandir(self, remote_path):
+    cls = SlowListingFsPConnection
+    with cls.lock:
+      cls.listing += 1
+      cls.max_listing = max(cls.max_listing, cls.listing)
+
+    try:
+      time.sleep(0.02)
+      return super()._scandir(remote_path)
+    finally:
+      with cls.lock:
+        cls.listing -= 1
+
+
+def test_rpull_lists_in_parallel(tmp_path):
+  for i in range(8):
+    (tmp_path / 'remote' / f'd{i}').mkdir(parents=True)
+    (tmp_path / 'remote' / f'd{i}' / 'f').write_text(str(i))
+  (tmp_path / 'local').mkdir()
+  (tmp_path / 'local' / 'd3').mkdir()
+  (tmp_path / 'local' / 'd3' / 'f').mkdir()
+
+  conn = SlowListingFsPConnection(make_settings())
+
+  # A local directory in the way of a remote file.
+  with pytest.raises(InterruptedError):
+    conn.rpull(str(tmp_path / 'remote'), str(tmp_path / 'local'), workers=4)
+
+  (tmp_path / 'local' / 'd3' / 'f').rmdir()
+  stats = conn.rpull(str(tmp_path / 'remote'), str(tmp_path / 'local'), workers=4)
+
+  assert stats.files == 8
+  assert SlowListingFsPConnection.max_listing > 1
+
+
+def test_chunked_push_pull(tmp_path):
+  data = os.urandom(1000)
+  (tmp_path / 'local').write_bytes(data)
+
+  conn = FsPConnection(make_settings(chunked_transfer_workers=3, chunked_transfer_threshold=100, chunked_transfer_chunk_size=64))
+
+  conn.push(str(tmp_path / 'local'), str(tmp_path / 'remote'))
+  assert (tmp_path / 'remote').read_bytes() == data
+
+  conn.pull(str(tmp_path / 'remote'), str(tmp_path / 'pulled'))
+  assert (tmp_path / 'pulled').read_bytes() == data
+
+  # Smaller files are transferred at once.
+  (tmp_path / 'small').write_bytes(b'x' * 10)
+  conn.push(str(tmp_path / 'small'), str(tmp_path / 'remote'))
+  assert (tmp_path / 'remote').read_bytes() == b'x' * 10
+  assert sorted(os.listdir(tmp_path)) == ['local', 'pulled', 'remote', 'small']
+
+
+class ShortWritingFsPConnection(CountingFsPConnection):
+  '''CountingFsPConnection, which writes the first range of a chunked upload only partly, so the size of the file is still right.'''
+
+  def _open(self, remote_path, mode):
+    stream = super()._open(remote_path, mode)
+    if mode != 'r+b':
+      return stream
+
+    write = stream.write
+    stream.write = lambda data: write(data[:len(data) // 2] if stream.tell() == 0 else data)
+    return stream
+
+
+def test_chunked_transfer_checks_ranges_and_reuses_sizes(tmp_path):
+  (tmp_path / 'local').write_bytes(os.urandom(1000))
+  settings = make_settings(chunked_transfer_workers=3, chunked_transfer_threshold=100, chunked_transfer_chunk_size=64)
+
+  with pytest.raises(IOError):
+    ShortWritingFsPConnection(settings).push(str(tmp_path / 'local'), str(tmp_path / 'remote'))
+
+  conn = CountingFsPConnection(settings)
+  conn.push(str(tmp_path / 'local'), str(tmp_path / 'remote'))
+
+  # The size of the pulled file is known from the validation and from the listing (each chunked pull stats the file only at the end).
+  conn.calls.clear()
+  conn.pull(str(tmp_path / 'remote'), str(tmp_path / 'pulled'))
+  assert conn.calls['_stat'] == 2 and conn.calls['_isdir'] == 0
+
+  (tmp_path / 'tree').mkdir()
+  os.replace(tmp_path / 'pulled', tmp_path / 'tree' / 'file')
+  conn.calls.clear()
+  conn.rpull(str(tmp_path / 'tree'), str(tmp_path / 'tree_pulled'))
+  assert conn.calls['_stat'] == 1
+  assert (tmp_path / 'tree_pulled' / 'file').read_bytes() == (tmp_path / 'local').read_bytes()
+
+
+def test_fcp_without_staging(tmp_path):
+  source = tmp_path / 'source'
+  source.write_bytes(os.urandom(3 * CHUNK_SIZE + 5))
+  (tmp_path / 'target').write_text('old content')
+
+  conn = CountingFsPConnection(make_settings())
+  conn.fcp(str(source), str(tmp_path / 'target'))
+  (tmp_path / 'dir').mkdir()
+  conn.dcp([str(source)], str(tmp_path / 'dir'))
+
+  assert (tmp_path / 'target').read_bytes() == (tmp_path / 'dir' / 'source').read_bytes() == source.read_bytes()
+  assert conn.calls['_copy'] == 2
+  assert conn.calls['_pull'] == conn.calls['_push'] == 0
+
+  # The default implementation streams the data through memory.
+  PConnection._copy(conn, str(source), str(tmp_path / 'streamed'))
+  assert (tmp_path / 'streamed').read_bytes() == source.read_bytes()
+
+
+def test_fs_copy_fallbacks(tmp_path, monkeypatch):
+  source = tmp_path / 'source'
+  source.write_bytes(os.urandom(1000))
+  source.chmod(0o700)
+
+  def unsupported(*args):
+    raise OSError(errno.EXDEV, 'Invalid cross-device link')
+
+  calls = []
+
+  def first_block_only(src_fd, dst_fd, count, *args):
+    # Copies a part of the file, the next method must continue after it.
+    calls.append(count)
+    if len(calls) > 1:
+      unsupported()
+    return os.write(dst_fd, os.read(src_fd, 100))
+
+  conn = FsPConnection(make_settings())
+  monkeypatch.setattr(fs_pconnection, '_FICLONE', 0)
+  monkeypatch.setattr(os, 'copy_file_range', first_block_only, raising=False)
+  conn.pull(str(source), str(tmp_path / 'sendfile'))
+
+  monkeypatch.setattr(os, 'sendfile', unsupported)
+  calls.clear()
+  conn.pull(str(source), str(tmp_path / 'buffered'))
+
+  for name in ('sendfile', 'buffered'):
+    assert (tmp_path / name).read_bytes() == source.read_bytes()
+    assert (tmp_path / name).stat().st_mode & 0o777 != 0o700
@@ -0,0 +1,116 @@
+import os
+
+from fs_helpers import CountingFsPConnection, make_settings
+
+
+def make_tree(root):
+  (root / 'dir' / 'sub' / 'deep').mkdir(parents=True)
+  (root / 'dir' / 'skip').mkdir()
+  (root / 'dir' / 'a').write_text('a')
+  (root / 'dir' / 'sub' / 'b').write_text('b')
+  (root / 'dir' / 'skip' / 'c').write_text('c')
+  os.symlink('sub', root / 'dir' / 'link')
+
+
+def test_walk_matches_os_walk(tmp_path):
+  make_tree(tmp_path)
+  conn = CountingFsPConnection(make_settings())
+  top = str(tmp_path / 'dir')
+
+  def normalized(tree):
+    return sorted((path, sorted(dirs), sorted(files)) for path, dirs, files in tree)
+
+  for topdown in (True, False):
+    assert normalized(conn.walk(top, topdown=topdown)) == normalized(
+      (path, [d for d in dirs if not os.path.islink(os.path.join(path, d))], files + [d for d in dirs if os.path.islink(os.path.join(path, d))])
+      for path, dirs, files in os.walk(top, topdown=topdown))
+
+  assert conn.calls['_listdir'] == 0
+
+
+def test_walk_pruning_and_order(tmp_path):
+  make_tree(tmp_path)
+  conn = CountingFsPConnection(make_settings())
+  top = str(tmp_path / 'dir')
+
+  visited = []
+  for path, dirs, files in conn.walk(top):
+    visited.append(path)
+    if 'skip' in dirs:
+      dirs.remove('skip')
+
+  assert os.path.join(top, 'skip') not in visited
+  assert visited[0] == top
+
+  bottom_up = [path for path, _, _ in conn.walk(top, topdown=False)]
+  assert bottom_up[-1] == top
+  assert bottom_up.index(os.path.join(top, 'sub', 'deep')) < bottom_up.index(os.path.join(top, 'sub'))
+
+  followed = [path for path, _, _ in conn.walk(top, follow_symlinks=True)]
+  assert os.path.join(top, 'link', 'deep') in followed
+
+
+def test_find_and_recursive_rm(tmp_path):
+  make_tree(tmp_path)
+  conn = CountingFsPConnection(make_settings())
+  top = str(tmp_path / 'dir')
+
+  found = conn.find(top)
+  assert found[0] == top
+  assert len(found) == len(set(found)) == 8
+  assert os.path.join(top, 'link') in found
+
+  child_first = conn.find(top, child_first=True)
+  assert child_first[-1] == top
+  assert sorted(child_first) == sorted(found)
+
+  assert conn.find(os.path.join(top, 'a')) == [os.path.join(top, 'a')]
+
+  conn.rm(top, recursive=True)
+  assert not os.path.lexists(top)
+
+
+def make_wide_tree(root):
+  for i in range(5):
+    for j in range(4):
+      (root / 'wide' / f'd{i}' / f'e{j}').mkdir(parents=True)
+      (root / 'wide' / f'd{i}' / f'e{j}' / 'f').write_text('f')
+
+
+def test_parallel_walk(tmp_path):
+  make_wide_tree(tmp_path)
+  conn = CountingFsPConnection(make_settings())
+  top = str(tmp_path / 'wide')
+
+  for topdown in (True, False):
+    sequential = list(conn.walk(top, topdown=topdown))
+    assert list(conn.walk(top, topdown=topdown, workers=4)) == sequential
+
+    unordered = list(conn.walk(top, topdown=topdown, workers=4, ordered=False))
+    assert sorted(unordered) == sorted(sequential)
+
+    # Each directory is yielded after (bottom up) or before (top down) all its subdirectories.
+    paths = [path for path, _, _ in unordered]
+    for path in paths:
+      parent = os.path.dirname(path)
+      if parent in paths:
+        assert (paths.index(parent) < paths.index(path)) == topdown
+
+  visited = []
+  for path, dirs, files in conn.walk(top, workers=4, ordered=False):
+    visited.append(path)
+    dirs[:] = [d for d in dirs if d != 'd0']
+
+  assert len(visited) == 1 + 4 * 5 and os.path.join(top, 'd0') not in visited
+
+  assert len(conn.find(top, workers=3)) == 1 + 5 + 2 * 4 * 5
+  conn.rm(top, recursive=True, workers=3)
+  assert not os.path.lexists(top)
+
+
+def test_parallel_walk_errors(tmp_path):
+  conn = CountingFsPConnection(make_settings())
+
+  errors = []
+  assert list(conn.walk(str(tmp_path / 'missing'), onerror=errors.append, workers=2)) == []
+  assert isinstance(errors[0], FileNotFoundError)